@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк разреженной записи: размер файла, время записи и чтения в сравнении с CSV.
+История строится повторением строк owen_cloud_data.csv с шагом ~60 сек.
+
+Пример:
+    python bench_sparse_storage.py --rows 50000
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+from owen_sparse_store import SparseRecorder, iter_rows, read_rows
+
+
+def load_sample_rows(csv_filename: str, n_params: int):
+    with open(csv_filename, 'r', newline='', encoding='utf-8') as f:
+        return [row[2:] for row in csv.reader(f) if len(row) == n_params + 2 and row[0] != "timestamp"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк разреженной записи измерений")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--keyframe-interval", type=int, default=60)
+    parser.add_argument("--csv", default="owen_cloud_data.csv")
+    parser.add_argument("--config", default="owen_config.json")
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    with open(args.config, 'r', encoding='utf-8') as f:
+        param_ids = json.load(f)["parameter_ids"]
+    samples = load_sample_rows(args.csv, len(param_ids))
+    if not samples:
+        print("[!] Нет строк для бенчмарка")
+        return
+
+    workdir = tempfile.mkdtemp(prefix="owen_sparse_bench_")
+    csv_path = os.path.join(workdir, "data.csv")
+    sparse_path = os.path.join(workdir, "data.sparse")
+    start = time.time()
+
+    # Запись построчно, как в синхронизаторе (открытие файла на каждую строку)
+    started = time.perf_counter()
+    for i in range(args.rows):
+        timestamp = start + i * 60.123
+        with open(csv_path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow([timestamp, "2025-01-01 00:00:00.000"] + samples[i % len(samples)])
+    csv_write = time.perf_counter() - started
+
+    recorder = SparseRecorder(sparse_path, param_ids, args.keyframe_interval)
+    started = time.perf_counter()
+    for i in range(args.rows):
+        recorder.append(start + i * 60.123, dict(zip(param_ids, samples[i % len(samples)])))
+    sparse_write = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+        csv_rows = sum(1 for _ in csv.reader(f))
+    csv_read = time.perf_counter() - started
+
+    started = time.perf_counter()
+    sparse_rows = 0
+    for i, (_, _, values) in enumerate(iter_rows(sparse_path)):
+        assert values == samples[i % len(samples)], f"Строка {i} восстановлена неверно"
+        sparse_rows += 1
+    sparse_read = time.perf_counter() - started
+
+    started = time.perf_counter()
+    read_rows(sparse_path, 100)
+    sparse_tail = time.perf_counter() - started
+
+    csv_size = os.path.getsize(csv_path)
+    sparse_size = os.path.getsize(sparse_path)
+    print("=" * 70)
+    print(f"Строк:                     {args.rows} (CSV {csv_rows}, разреженных {sparse_rows})")
+    print(f"Размер CSV:                {csv_size / 1024:.0f} КБ")
+    print(f"Размер разреженного файла: {sparse_size / 1024:.0f} КБ ({sparse_size / csv_size * 100:.1f}%)")
+    print(f"Запись, мкс/строка:        CSV {csv_write / args.rows * 1e6:.0f}, разреженная {sparse_write / args.rows * 1e6:.0f}")
+    print(f"Полное чтение, сек:        CSV {csv_read:.2f}, разреженное (с восстановлением) {sparse_read:.2f}")
+    print(f"Последние 100 строк, сек:  {sparse_tail:.2f}")
+    print(f"Файлы прогона:             {workdir}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
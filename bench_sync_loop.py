@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Сквозной бенчмарк цикла синхронизации на офлайн-симуляторе OWEN Cloud.
+Прогоняет синхронизатор в виртуальном (или ускоренном) времени и выводит
+долю пропущенных циклов, задержку обнаружения и число запросов на цикл.
+
+Пример:
+    python bench_sync_loop.py --cycles 2000 --error-rate 0.01
+
+В виртуальном времени ответ приходит мгновенно, поэтому дублирующие опросы не
+отправляются; их долю измеряет только прогон с --clock accelerated:
+    python bench_sync_loop.py --cycles 200 --clock accelerated --tail-probability 0.05
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+
+import owen_cloud_synchronizer as synchronizer
+from owen_clock import AcceleratedClock, VirtualClock
+from owen_cloud_simulator import OwenCloudSimulator, DEVICE_ID, load_parameter_names
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run(args) -> dict:
+    clock = VirtualClock() if args.clock == "virtual" else AcceleratedClock(args.speed)
+    parameter_names = load_parameter_names(os.path.abspath(synchronizer.CONFIG_FILENAME))
+    simulator = OwenCloudSimulator(
+        clock=clock,
+        parameter_names=parameter_names,
+        cycle_min=args.cycle_min,
+        cycle_max=args.cycle_max,
+        latency_min=args.latency_min,
+        latency_max=args.latency_max,
+        tail_probability=args.tail_probability,
+        tail_latency=args.tail_latency,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        seed=args.seed
+    )
+
+    synchronizer.clock = clock
+    synchronizer.transport = simulator
+    # Собственный сегмент буфера: не трогаем буфер работающего синхронизатора
+    synchronizer.RING_BUFFER_NAME = f"owen_bench_{os.getpid()}"
+    duration = args.cycles * (args.cycle_min + args.cycle_max) / 2
+
+    # Все файлы синхронизатора пишутся во временный каталог
+    workdir = tempfile.mkdtemp(prefix="owen_bench_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with open(synchronizer.CONFIG_FILENAME, 'w', encoding='utf-8') as f:
+            json.dump({
+                "device_id": DEVICE_ID,
+                "synchronization_param_id": simulator.sync_param_id,
+                "indicator_param_id": simulator.indicator_param_id,
+                "parameter_ids": list(parameter_names),
+                "parameter_names": {str(k): v for k, v in parameter_names.items()}
+            }, f)
+
+        started = time.perf_counter()
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            synchronizer.synchronization_loop(max_duration=duration)
+        wall_time = time.perf_counter() - started
+    finally:
+        os.chdir(cwd)
+
+    stats = simulator.stats()
+    stats["poll"] = dict(synchronizer.poll_stats)
+    stats["wall_time"] = wall_time
+    stats["workdir"] = workdir
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк цикла синхронизации на симуляторе")
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--clock", choices=["virtual", "accelerated"], default="virtual")
+    parser.add_argument("--speed", type=float, default=100.0, help="Ускорение для --clock accelerated")
+    parser.add_argument("--cycle-min", type=float, default=50)
+    parser.add_argument("--cycle-max", type=float, default=70)
+    parser.add_argument("--latency-min", type=float, default=0.05)
+    parser.add_argument("--latency-max", type=float, default=0.25)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=1200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        sys.stdout.reconfigure(encoding='utf-8')
+
+    stats = run(args)
+    latencies = stats["detection_latencies"]
+
+    print("=" * 60)
+    print(f"Циклов прибора:           {stats['cycles']}")
+    print(f"Пропущено циклов:         {stats['missed']} ({stats['miss_rate'] * 100:.2f}%)")
+    if latencies:
+        print(f"Задержка обнаружения, с:  среднее {sum(latencies) / len(latencies):.3f}, "
+              f"p50 {percentile(latencies, 0.5):.3f}, p95 {percentile(latencies, 0.95):.3f}, "
+              f"max {max(latencies):.3f}")
+    print(f"Запросов на цикл:         {stats['requests_per_cycle']:.1f}")
+    for endpoint, count in sorted(stats["requests"].items()):
+        print(f"    {endpoint}: {count}")
+    poll = stats["poll"]
+    if args.clock == "virtual":
+        print(f"Дублирующих опросов:      не измеряется в виртуальном времени (--clock accelerated), "
+              f"опросов: {poll['polls']}, пропущено слотов: {poll['skipped_slots']}")
+    else:
+        print(f"Дублирующих опросов:      {poll['hedges']} из {poll['polls']} (+{poll['extra_request_ratio'] * 100:.1f}%), "
+              f"выиграли: {poll['hedge_wins']}, пропущено слотов: {poll['skipped_slots']}")
+    print(f"Внедренных ошибок:        {stats['injected_errors']}")
+    print(f"Истекших токенов:         {stats['expired_tokens']}")
+    print(f"Время прогона:            {stats['wall_time']:.1f} сек")
+    print(f"Файлы прогона:            {stats['workdir']}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
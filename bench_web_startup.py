@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк запуска веб-процесса: время импорта web_app, пиковая память (RSS)
+и время get_data() в свежем интерпретаторе. Для сравнения измеряется импорт pandas.
+
+Пример:
+    python bench_web_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+
+CHILD_CODE = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+{imports}
+imported = time.perf_counter()
+{call}
+finished = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == 'darwin':
+    rss //= 1024
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "call_ms": (finished - imported) * 1000,
+    "max_rss_mb": rss / 1024,
+    "pandas_loaded": "pandas" in sys.modules
+}}))
+"""
+
+SCENARIOS = [
+    ("import web_app", "import web_app", "pass"),
+    ("import web_app + get_data(100)", "import web_app", "web_app.get_data(100)"),
+    ("import pandas (для сравнения)", "import pandas", "pass"),
+]
+
+
+def measure(imports: str, call: str):
+    code = CHILD_CODE.format(imports=imports, call=call)
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        return None
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк запуска веб-интерфейса")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    if sys.platform == 'win32':
+        print("[!] Бенчмарк использует модуль resource и работает только на Linux/macOS")
+        return
+
+    print("=" * 80)
+    for title, imports, call in SCENARIOS:
+        samples = [measure(imports, call) for _ in range(args.runs)]
+        samples = [s for s in samples if s]
+        if not samples:
+            print(f"{title:<34} недоступно (модуль не установлен)")
+            continue
+        best = min(samples, key=lambda s: s["import_ms"] + s["call_ms"])
+        print(f"{title:<34} импорт {best['import_ms']:7.1f} мс, вызов {best['call_ms']:6.1f} мс, "
+              f"RSS {best['max_rss_mb']:6.1f} МБ, pandas загружен: {'да' if best['pandas_loaded'] else 'нет'}")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
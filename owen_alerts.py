@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Правила оповещений, проверяемые при записи каждой строки измерений.
+
+Правила загружаются из owen_alerts.json, один раз компилируются в объекты с
+постоянным (O(1)) состоянием и проверяются в фоновом потоке: синхронизатор только
+кладет строку в очередь и не ждет проверки.
+
+Типы правил ("parameter" - имя параметра, допускаются шаблоны вида "Temp_*"):
+    {"type": "threshold", "parameter": "Temp_1", "min": 0, "max": 90}
+    {"type": "rate", "parameter": "Tok_*", "max_per_second": 0.5}
+    {"type": "stuck", "parameter": "Temp_*", "samples": 30}
+    {"type": "no_update", "factor": 2.5}                       - нет обновлений дольше factor x ожидаемый цикл
+    {"type": "no_update", "parameter": "Temp_1", "factor": 10} - значение параметра не менялось
+
+Оповещение отправляется при переходе правила в сработавшее состояние ("firing")
+и при возврате в норму ("resolved"). Способы доставки ("notifiers"): log, file,
+webhook, memory; свои добавляются через register_notifier().
+"""
+
+import fnmatch
+import json
+import os
+import queue
+import threading
+from typing import Optional, Dict, List, Any
+
+
+ALERTS_CONFIG_FILENAME = "owen_alerts.json"
+ALERTS_LOG_FILENAME = "owen_alerts.jsonl"
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+# =============================================================================
+# ПРАВИЛА
+# =============================================================================
+
+class Rule:
+    """Базовое правило: хранит только признак срабатывания."""
+
+    def __init__(self, name: str, param_id: Optional[int] = None, param_name: Optional[str] = None):
+        self.name = name
+        self.param_id = param_id
+        self.param_name = param_name
+        self.firing = False
+
+    def _transition(self, violated: bool, timestamp: float, message: str,
+                    value: Any = None) -> Optional[Dict[str, Any]]:
+        """Оповещение только при смене состояния правила."""
+        if violated == self.firing:
+            return None
+        self.firing = violated
+        return {
+            "time": timestamp,
+            "rule": self.name,
+            "parameter": self.param_name,
+            "state": "firing" if violated else "resolved",
+            "message": message,
+            "value": value
+        }
+
+    def evaluate(self, timestamp: float, value: Any) -> Optional[Dict[str, Any]]:
+        """Проверить новое значение параметра."""
+        return None
+
+    def check(self, now: float, predicted_cycle: Optional[float]) -> Optional[Dict[str, Any]]:
+        """Проверить правило по времени (без новой строки)."""
+        return None
+
+
+class ThresholdRule(Rule):
+    def __init__(self, name, param_id, param_name, minimum=None, maximum=None):
+        super().__init__(name, param_id, param_name)
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def evaluate(self, timestamp, value):
+        number = _to_float(value)
+        if number is None:
+            return None
+        violated = ((self.minimum is not None and number < self.minimum)
+                    or (self.maximum is not None and number > self.maximum))
+        message = f"{self.param_name} = {number} вне диапазона [{self.minimum}, {self.maximum}]"
+        return self._transition(violated, timestamp, message if violated else f"{self.param_name} = {number} в норме", number)
+
+
+class RateRule(Rule):
+    def __init__(self, name, param_id, param_name, max_per_second):
+        super().__init__(name, param_id, param_name)
+        self.max_per_second = max_per_second
+        self.last_value = None
+        self.last_time = None
+
+    def evaluate(self, timestamp, value):
+        number = _to_float(value)
+        if number is None:
+            return None
+        previous, previous_time = self.last_value, self.last_time
+        self.last_value, self.last_time = number, timestamp
+        if previous is None or timestamp <= previous_time:
+            return None
+        rate = (number - previous) / (timestamp - previous_time)
+        violated = abs(rate) > self.max_per_second
+        message = f"{self.param_name}: скорость изменения {rate:.4g}/сек (предел {self.max_per_second})"
+        return self._transition(violated, timestamp, message, number)
+
+
+class StuckRule(Rule):
+    def __init__(self, name, param_id, param_name, samples):
+        super().__init__(name, param_id, param_name)
+        self.samples = samples
+        self.last_value = None
+        self.repeats = 0
+
+    def evaluate(self, timestamp, value):
+        if value == self.last_value:
+            self.repeats += 1
+        else:
+            self.last_value = value
+            self.repeats = 1
+        violated = self.repeats >= self.samples
+        message = f"{self.param_name} = {value} не меняется {self.repeats} строк подряд"
+        return self._transition(violated, timestamp, message if violated else f"{self.param_name} снова меняется", value)
+
+
+class NoUpdateRule(Rule):
+    """Нет новых строк (или изменений параметра) дольше factor x ожидаемый цикл."""
+
+    def __init__(self, name, param_id, param_name, factor, started):
+        super().__init__(name, param_id, param_name)
+        self.factor = factor
+        self.last_update = started
+        self.last_value = None
+
+    def evaluate(self, timestamp, value):
+        if self.param_id is not None and value == self.last_value:
+            return None
+        self.last_value = value
+        self.last_update = timestamp
+        return self._transition(False, timestamp, f"{self.param_name or 'Данные'}: обновление получено", value)
+
+    def check(self, now, predicted_cycle):
+        if not predicted_cycle:
+            return None
+        silence = now - self.last_update
+        if silence <= self.factor * predicted_cycle:
+            return None
+        subject = self.param_name or "Данные"
+        return self._transition(True, now, f"{subject}: нет обновлений {silence:.0f} сек "
+                                           f"(ожидаемый цикл {predicted_cycle:.0f} сек)")
+
+
+def compile_rules(rules_config: List[Dict[str, Any]], parameter_names: Dict[Any, str],
+                  started: float) -> List[Rule]:
+    """
+    Скомпилировать правила: шаблоны имен разворачиваются в ID параметров.
+
+    Аргументы:
+        rules_config (list): Правила из конфигурации
+        parameter_names (dict): {param_id: имя параметра}
+        started (float): Время запуска (отсчет для no_update)
+
+    Возвращает:
+        list: Список правил
+    """
+    names = {int(param_id): name for param_id, name in parameter_names.items()}
+    rules = []
+    for index, config in enumerate(rules_config):
+        rule_type = config.get("type")
+        pattern = config.get("parameter")
+        base_name = config.get("name", f"{rule_type}_{index + 1}")
+
+        if pattern is None:
+            if rule_type != "no_update":
+                raise ValueError(f"Правило {base_name}: не указан parameter")
+            rules.append(NoUpdateRule(base_name, None, None, config.get("factor", 2.0), started))
+            continue
+
+        matched = [(param_id, name) for param_id, name in names.items() if fnmatch.fnmatchcase(name, pattern)]
+        if not matched:
+            print(f"[!] Правило {base_name}: нет параметров, подходящих под '{pattern}'")
+
+        for param_id, param_name in matched:
+            name = base_name if len(matched) == 1 else f"{base_name}:{param_name}"
+            if rule_type == "threshold":
+                rules.append(ThresholdRule(name, param_id, param_name, config.get("min"), config.get("max")))
+            elif rule_type == "rate":
+                rules.append(RateRule(name, param_id, param_name, config["max_per_second"]))
+            elif rule_type == "stuck":
+                rules.append(StuckRule(name, param_id, param_name, config.get("samples", 30)))
+            elif rule_type == "no_update":
+                rules.append(NoUpdateRule(name, param_id, param_name, config.get("factor", 2.0), started))
+            else:
+                raise ValueError(f"Правило {base_name}: неизвестный тип {rule_type}")
+    return rules
+
+
+# =============================================================================
+# ДОСТАВКА ОПОВЕЩЕНИЙ
+# =============================================================================
+
+class LogNotifier:
+    """Вывод в журнал синхронизатора."""
+
+    def notify(self, alert: Dict[str, Any]):
+        mark = "[!]" if alert["state"] == "firing" else "[+]"
+        print(f"{mark} ОПОВЕЩЕНИЕ {alert['rule']}: {alert['message']}")
+
+
+class FileNotifier:
+    """Запись оповещений в JSONL файл (его показывает веб-интерфейс)."""
+
+    def __init__(self, path: str = ALERTS_LOG_FILENAME):
+        self.path = path
+
+    def notify(self, alert: Dict[str, Any]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(alert, ensure_ascii=False) + "\n")
+
+
+class WebhookNotifier:
+    """POST оповещения в JSON на заданный URL."""
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def notify(self, alert: Dict[str, Any]):
+        import requests
+        requests.post(self.url, json=alert, timeout=self.timeout)
+
+
+class MemoryNotifier:
+    """Накопление оповещений в памяти (для локальной проверки правил)."""
+
+    def __init__(self):
+        self.alerts = []
+
+    def notify(self, alert: Dict[str, Any]):
+        self.alerts.append(alert)
+
+
+NOTIFIER_TYPES = {
+    "log": LogNotifier,
+    "file": FileNotifier,
+    "webhook": WebhookNotifier,
+    "memory": MemoryNotifier,
+}
+
+
+def register_notifier(notifier_type: str, notifier_class):
+    """Добавить свой способ доставки (класс с методом notify(alert))."""
+    NOTIFIER_TYPES[notifier_type] = notifier_class
+
+
+def create_notifier(config: Dict[str, Any]):
+    options = {k: v for k, v in config.items() if k != "type"}
+    return NOTIFIER_TYPES[config["type"]](**options)
+
+
+# =============================================================================
+# ДВИЖОК
+# =============================================================================
+
+class AlertEngine:
+    """Проверка правил в фоновом потоке."""
+
+    def __init__(self, rules: List[Rule], notifiers: List[Any], clock=None,
+                 tick: float = 1.0, max_queue: int = 1000, default_cycle: Optional[float] = None):
+        """
+        Аргументы:
+            rules (list): Скомпилированные правила
+            notifiers (list): Способы доставки
+            clock: Часы синхронизатора (для правил no_update)
+            tick (float): Период проверки правил по времени (сек)
+            max_queue (int): Максимум строк, ожидающих проверки
+            default_cycle (float): Ожидаемый цикл, пока он не измерен синхронизатором
+                                   (иначе no_update не сработает, если прибор молчит с момента запуска)
+        """
+        self.rules = rules
+        self.notifiers = notifiers
+        self.clock = clock
+        self.tick = tick
+        self.predicted_cycle = None
+        self.default_cycle = default_cycle
+        self.dropped = 0
+        self._by_param = {}
+        for rule in rules:
+            self._by_param.setdefault(rule.param_id, []).append(rule)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._stop = threading.Event()
+
+    def submit(self, timestamp: float, parameters_data: Dict[int, Any],
+               predicted_cycle: Optional[float] = None):
+        """Передать строку на проверку (не блокирует цикл синхронизации)."""
+        try:
+            self._queue.put_nowait((timestamp, dict(parameters_data), predicted_cycle))
+        except queue.Full:
+            self.dropped += 1
+
+    def process(self, timestamp: float, parameters_data: Dict[int, Any],
+                predicted_cycle: Optional[float] = None):
+        """Проверить строку сразу (в текущем потоке)."""
+        if predicted_cycle:
+            self.predicted_cycle = predicted_cycle
+        for rule in self._by_param.get(None, []):
+            self._emit(rule.evaluate(timestamp, None))
+        for param_id, value in parameters_data.items():
+            for rule in self._by_param.get(int(param_id), ()):
+                self._emit(rule.evaluate(timestamp, value))
+
+    def check(self, now: float):
+        """Проверить правила по времени."""
+        for rule in self.rules:
+            self._emit(rule.check(now, self.predicted_cycle or self.default_cycle))
+
+    def _emit(self, alert: Optional[Dict[str, Any]]):
+        if alert is None:
+            return
+        for notifier in self.notifiers:
+            try:
+                notifier.notify(alert)
+            except Exception as e:
+                print(f"[!] Ошибка доставки оповещения ({type(notifier).__name__}): {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.process(*self._queue.get(timeout=self.tick))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                print(f"[!] Ошибка проверки правил оповещений: {e}")
+            if self.clock is not None:
+                self.check(self.clock.time())
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="alerts", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.tick * 2)
+
+
+def get_alerts_log_path(filename: str = ALERTS_CONFIG_FILENAME) -> Optional[str]:
+    """
+    Файл, в который пишет оповещения FileNotifier по конфигурации.
+
+    Возвращает:
+        str: Путь к файлу или None, если запись в файл не настроена
+    """
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except Exception:
+        return None
+    for notifier in config.get("notifiers", [{"type": "log"}]):
+        if notifier.get("type") == "file":
+            return notifier.get("path", ALERTS_LOG_FILENAME)
+    return None
+
+
+def load_alert_engine(parameter_names: Dict[Any, str], clock,
+                      filename: str = ALERTS_CONFIG_FILENAME,
+                      default_cycle: Optional[float] = None) -> Optional[AlertEngine]:
+    """
+    Загрузить правила из файла и создать движок.
+
+    Аргументы:
+        parameter_names (dict): {param_id: имя параметра}
+        clock: Часы синхронизатора
+        filename (str): Файл правил
+        default_cycle (float): Ожидаемый цикл до первых измерений (сек)
+
+    Возвращает:
+        AlertEngine: Движок или None, если файла нет или он некорректен
+    """
+    if not os.path.exists(filename):
+        return None
+
+    try:
+        with open(filename, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        rules = compile_rules(config.get("rules", []), parameter_names, clock.time())
+        notifiers = [create_notifier(n) for n in config.get("notifiers", [{"type": "log"}])]
+    except Exception as e:
+        print(f"[!] Ошибка загрузки правил оповещений из {filename}: {e}")
+        return None
+
+    print(f"[+] Правил оповещений: {len(rules)}, способов доставки: {len(notifiers)}")
+    return AlertEngine(rules, notifiers, clock, default_cycle=default_cycle)
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Часы для цикла синхронизации.
+Позволяют запускать синхронизатор в реальном, ускоренном или виртуальном времени
+(например, вместе с симулятором облака owen_cloud_simulator.py).
+"""
+
+import threading
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+
+class SystemClock:
+    """Обычные системные часы."""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, futures, timeout: float = None):
+        """Дождаться первого завершенного запроса (не дольше timeout)."""
+        return wait(futures, timeout, FIRST_COMPLETED)
+
+
+class AcceleratedClock:
+    """
+    Ускоренные часы: время идет в speed раз быстрее реального.
+    sleep() действительно ждет, но в speed раз меньше.
+    """
+
+    def __init__(self, speed: float = 10.0, start: float = None):
+        self.speed = speed
+        self._start = time.time() if start is None else start
+        self._real_start = time.monotonic()
+
+    def monotonic(self) -> float:
+        return (time.monotonic() - self._real_start) * self.speed
+
+    def time(self) -> float:
+        return self._start + self.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds / self.speed)
+
+    def wait(self, futures, timeout: float = None):
+        return wait(futures, None if timeout is None else timeout / self.speed, FIRST_COMPLETED)
+
+
+class VirtualClock:
+    """
+    Виртуальные часы: время стоит, пока его не продвинет sleep().
+    Позволяет прогнать тысячи циклов синхронизации за секунды.
+    """
+
+    def __init__(self, start: float = None):
+        self._start = time.time() if start is None else start
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def time(self) -> float:
+        return self._start + self._elapsed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._elapsed += seconds
+
+    def wait(self, futures, timeout: float = None):
+        # Запрос в виртуальном времени завершается мгновенно, таймаут не имеет смысла
+        return wait(futures, None, FIRST_COMPLETED)
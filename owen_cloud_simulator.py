@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Офлайн-симулятор OWEN Cloud API.
+Имитирует эндпоинты /auth/open, /device/index, /device/{id} и /parameters/write-data,
+прибор с циклом обновления 50-70 сек, задержки сети, ошибки и истечение токена.
+
+Может использоваться напрямую как транспорт синхронизатора (метод post)
+или запускаться как локальный HTTP сервер:
+    python owen_cloud_simulator.py --port 8090
+    (в синхронизаторе API_URL = "http://127.0.0.1:8090/v1")
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Tuple
+
+from owen_clock import SystemClock
+
+
+DEVICE_ID = 571919
+CONFIG_FILENAME = "owen_config.json"
+
+
+class SimulatedResponse:
+    """Минимальная замена requests.Response."""
+
+    def __init__(self, status_code: int, payload: Any):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = json.dumps(payload, ensure_ascii=False)
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class OwenCloudSimulator:
+    """
+    Симулятор облака с одним прибором.
+
+    Прибор раз в цикл (равномерно в диапазоне cycle_min..cycle_max сек) увеличивает
+    параметр synchronization и обновляет остальные значения. Синхронизатор должен
+    переключить indicator_of_new_cycle до следующего обновления, иначе цикл считается пропущенным.
+    """
+
+    def __init__(self,
+                 clock=None,
+                 parameter_names: Optional[Dict[int, str]] = None,
+                 cycle_min: float = 50,
+                 cycle_max: float = 70,
+                 latency_min: float = 0.05,
+                 latency_max: float = 0.25,
+                 tail_probability: float = 0.0,
+                 tail_latency: float = 2.0,
+                 error_rate: float = 0.0,
+                 token_ttl: float = 1200,
+                 seed: Optional[int] = None):
+        """
+        Аргументы:
+            clock: Часы (SystemClock, AcceleratedClock или VirtualClock)
+            parameter_names (dict): {param_id: name}, по умолчанию из owen_config.json
+            cycle_min, cycle_max (float): Разброс длительности цикла прибора (сек)
+            latency_min, latency_max (float): Разброс задержки ответа (сек)
+            tail_probability (float): Вероятность медленного ответа
+            tail_latency (float): Задержка медленного ответа (сек)
+            error_rate (float): Вероятность ответа HTTP 503
+            token_ttl (float): Время жизни токена (сек)
+            seed (int): Начальное значение генератора случайных чисел
+        """
+        self.clock = clock or SystemClock()
+        self.cycle_min = cycle_min
+        self.cycle_max = cycle_max
+        self.latency_min = latency_min
+        self.latency_max = latency_max
+        self.tail_probability = tail_probability
+        self.tail_latency = tail_latency
+        self.error_rate = error_rate
+        self.token_ttl = token_ttl
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+        if parameter_names is None:
+            parameter_names = load_parameter_names()
+        self.parameter_names = parameter_names
+        self.sync_param_id = self._find_param("synchronization")
+        self.indicator_param_id = self._find_param("indicator_of_new_cycle")
+
+        self.values = {param_id: "0" for param_id in parameter_names}
+        self.values[self.sync_param_id] = "1"
+        self.tokens = {}
+
+        # Состояние цикла прибора
+        self.last_change = self.clock.time()
+        self.next_change = self.last_change + self._cycle_length()
+        self.indicator_written = True
+
+        # Статистика
+        self.changes = []  # [{"time", "sync", "detected", "written"}]
+        self.requests = {}
+        self.injected_errors = 0
+        self.expired_tokens = 0
+
+    # -------------------------------------------------------------------------
+    # Модель прибора
+    # -------------------------------------------------------------------------
+
+    def _find_param(self, name: str) -> int:
+        for param_id, param_name in self.parameter_names.items():
+            if param_name == name:
+                return param_id
+        raise ValueError(f"Параметр {name} отсутствует в симуляторе")
+
+    def _cycle_length(self) -> float:
+        return self.random.uniform(self.cycle_min, self.cycle_max)
+
+    def _advance(self, now: float):
+        """Применить все обновления прибора, наступившие к моменту now."""
+        while now >= self.next_change:
+            if self.changes:
+                self.changes[-1]["written"] = self.indicator_written
+            self.last_change = self.next_change
+            self.next_change = self.last_change + self._cycle_length()
+            self.indicator_written = False
+
+            sync_value = int(self.values[self.sync_param_id]) + 1
+            self.values[self.sync_param_id] = str(sync_value)
+            for param_id, name in self.parameter_names.items():
+                if name.startswith("Temp_"):
+                    self.values[param_id] = f"{self.random.uniform(20, 30):.5f}"
+                elif name.startswith("Tok_"):
+                    self.values[param_id] = str(self.random.randint(0, 3))
+            self.changes.append({
+                "time": self.last_change,
+                "sync": sync_value,
+                "detected": None,
+                "written": None
+            })
+
+    def _latency(self) -> float:
+        if self.tail_probability and self.random.random() < self.tail_probability:
+            return self.tail_latency
+        return self.random.uniform(self.latency_min, self.latency_max)
+
+    # -------------------------------------------------------------------------
+    # Эндпоинты
+    # -------------------------------------------------------------------------
+
+    def handle(self, path: str, payload: Any, authorization: Optional[str]) -> Tuple[int, Any]:
+        """
+        Обработать запрос к API.
+
+        Аргументы:
+            path (str): Путь относительно /v1 (например, "/device/index")
+            payload: Тело запроса (JSON)
+            authorization (str): Заголовок Authorization
+
+        Возвращает:
+            tuple: (HTTP статус, JSON ответ)
+        """
+        endpoint = re.sub(r"/device/\d+$", "/device/{id}", path)
+        latency = self._latency()
+
+        # Половина задержки до сервера, снимок данных, половина обратно
+        self.clock.sleep(latency / 2)
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            now = self.clock.time()
+            self._advance(now)
+            status, result = self._dispatch(endpoint, path, payload, authorization, now)
+            served_sync = self.values[self.sync_param_id]
+        self.clock.sleep(latency / 2)
+
+        if status == 200 and endpoint == "/device/{id}":
+            with self._lock:
+                self._mark_detected(int(served_sync))
+        return status, result
+
+    def _dispatch(self, endpoint: str, path: str, payload: Any,
+                  authorization: Optional[str], now: float) -> Tuple[int, Any]:
+        if endpoint == "/auth/open":
+            token = f"sim-{len(self.tokens) + 1}"
+            self.tokens[token] = now
+            return 200, {"token": token}
+
+        token = (authorization or "").replace("Bearer ", "")
+        if token not in self.tokens:
+            return 401, {"message": "Unauthorized"}
+        if now - self.tokens[token] > self.token_ttl:
+            self.expired_tokens += 1
+            return 401, {"message": "Token expired"}
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            self.injected_errors += 1
+            return 503, {"message": "Service unavailable"}
+
+        if endpoint == "/device/index":
+            return 200, [{"id": DEVICE_ID, "name": "Simulated PLC"}]
+
+        if endpoint == "/device/{id}":
+            if path != f"/device/{DEVICE_ID}":
+                return 404, {"message": "Device not found"}
+            parameters = [
+                {"id": param_id, "name": name, "code": name, "value": self.values[param_id]}
+                for param_id, name in self.parameter_names.items()
+            ]
+            return 200, {"id": DEVICE_ID, "parameters": parameters}
+
+        if endpoint == "/parameters/write-data":
+            for item in (payload or {}).get("data", []):
+                param_id = int(item.get("id"))
+                if param_id not in self.values:
+                    return 400, {"message": f"Unknown parameter {param_id}"}
+                if param_id == self.indicator_param_id and item.get("value") != self.values[param_id]:
+                    self.indicator_written = True
+                self.values[param_id] = str(item.get("value"))
+            return 200, {"writeGroupId": f"sim-group-{self.requests[endpoint]}"}
+
+        return 404, {"message": "Not found"}
+
+    def _mark_detected(self, sync_value: int):
+        """Запомнить момент, когда новое значение synchronization впервые дошло до клиента."""
+        for change in reversed(self.changes):
+            if change["sync"] == sync_value:
+                if change["detected"] is None:
+                    change["detected"] = self.clock.time()
+                break
+
+    def post(self, url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+             timeout: Optional[float] = None) -> SimulatedResponse:
+        """Совместимая с requests.post точка входа для синхронизатора."""
+        path = url.split("/v1", 1)[-1]
+        status, payload = self.handle(path, json, (headers or {}).get("Authorization"))
+        return SimulatedResponse(status, payload)
+
+    # -------------------------------------------------------------------------
+    # Статистика
+    # -------------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Сводная статистика по завершенным циклам прибора.
+
+        Возвращает:
+            dict: cycles, missed, miss_rate, detection_latencies, requests, requests_per_cycle
+        """
+        # Последний цикл еще не завершен - не учитываем его
+        completed = self.changes[:-1]
+        missed = sum(1 for change in completed if not change["written"])
+        latencies = [change["detected"] - change["time"] for change in completed if change["detected"] is not None]
+        total_requests = sum(self.requests.values())
+        return {
+            "cycles": len(completed),
+            "missed": missed,
+            "miss_rate": missed / len(completed) if completed else 0.0,
+            "detection_latencies": latencies,
+            "requests": dict(self.requests),
+            "requests_per_cycle": total_requests / len(completed) if completed else 0.0,
+            "injected_errors": self.injected_errors,
+            "expired_tokens": self.expired_tokens
+        }
+
+
+def load_parameter_names(filename: str = CONFIG_FILENAME) -> Dict[int, str]:
+    """Взять состав параметров из конфигурации синхронизатора."""
+    with open(filename, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    return {int(param_id): name for param_id, name in config["parameter_names"].items()}
+
+
+# =============================================================================
+# HTTP СЕРВЕР
+# =============================================================================
+
+def serve(simulator: OwenCloudSimulator, host: str = "127.0.0.1", port: int = 8090):
+    """Запустить симулятор как HTTP сервер (в реальном времени)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            try:
+                payload = json.loads(body) if body else None
+            except ValueError:
+                payload = None
+            path = self.path.split("/v1", 1)[-1]
+            status, result = simulator.handle(path, payload, self.headers.get("Authorization"))
+            data = json.dumps(result, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"[+] Симулятор OWEN Cloud: http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n[*] Симулятор остановлен")
+    finally:
+        server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-симулятор OWEN Cloud API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--cycle-min", type=float, default=50)
+    parser.add_argument("--cycle-max", type=float, default=70)
+    parser.add_argument("--latency-min", type=float, default=0.05)
+    parser.add_argument("--latency-max", type=float, default=0.25)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--token-ttl", type=float, default=1200)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulator = OwenCloudSimulator(
+        cycle_min=args.cycle_min,
+        cycle_max=args.cycle_max,
+        latency_min=args.latency_min,
+        latency_max=args.latency_max,
+        error_rate=args.error_rate,
+        token_ttl=args.token_ttl,
+        seed=args.seed
+    )
+    serve(simulator, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,19 @@
 
 import requests
 import json
-import time
 import csv
 import os
 from datetime import datetime
 from typing import Optional, Dict, List, Any, Tuple
 
+from owen_alerts import load_alert_engine, ALERTS_CONFIG_FILENAME
+from owen_clock import SystemClock
+from owen_cycle_trace import record_cycle_trace
+from owen_poll_scheduler import PollScheduler, HedgedPoller
+from owen_ring_buffer import open_writer as open_ring_buffer, SHM_NAME
+from owen_sparse_store import SparseRecorder, SPARSE_FILENAME
+from owen_write_queue import WriteQueue
+
 
 # =============================================================================
 # КОНФИГУРАЦИЯ
@@ -34,10 +41,31 @@ SYNC_CYCLE_MIN = 50  # Минимальное время цикла (секун
 SYNC_CYCLE_MAX = 70  # Максимальное время цикла (секунды)
 ACTIVE_WINDOW_START = 48  # Начало активного окна относительно последнего обновления (сек)
 ACTIVE_WINDOW_END = 72  # Конец активного окна (сек)
+HEDGE_PERCENTILE = 0.9  # Перцентиль RTT, после которого в активном окне отправляется дублирующий опрос
+HEDGE_MAX_EXTRA = 1  # Максимум дублирующих запросов на один опрос
+WRITE_REQUEST_TIMEOUT = 15  # HTTP таймаут запроса записи (сек)
+# Отдельная отправка очереди записи не позже чем за столько секунд до активного окна: даже зависший
+# запрос записи (до WRITE_REQUEST_TIMEOUT) завершится до начала окна и не задержит опросы в нем
+WRITE_FLUSH_MARGIN = WRITE_REQUEST_TIMEOUT + 5
 
 # Файл для сохранения данных
 CSV_FILENAME = "owen_cloud_data.csv"
 CONFIG_FILENAME = "owen_config.json"
+ALERTS_FILENAME = ALERTS_CONFIG_FILENAME  # Правила оповещений (если файла нет - оповещения выключены)
+
+# Режим записи измерений: "csv" - все каналы каждую строку, "sparse" - только изменившиеся
+# каналы с периодическими ключевыми кадрами (owen_sparse_store.py), "both" - оба файла
+RECORDING_MODE = "csv"
+SPARSE_KEYFRAME_INTERVAL = 60  # Ключевой кадр разреженной записи каждые N строк
+
+# Количество последних строк, публикуемых в разделяемую память для веб-интерфейса
+RING_BUFFER_CAPACITY = 10000
+# Имя сегмента разделяемой памяти (веб-интерфейс читает owen_ring_buffer.SHM_NAME), None - буфер выключен
+RING_BUFFER_NAME = SHM_NAME
+
+# Источник времени и HTTP транспорт (подменяются симулятором для офлайн-тестов)
+clock = SystemClock()
+transport = requests
 
 # Глобальные переменные для хранения состояния
 token_data = {
@@ -45,6 +73,9 @@ token_data = {
     "timestamp": 0
 }
 
+# Статистика опросов последнего запуска цикла (хеджирование, пропущенные слоты)
+poll_stats = {}
+
 device_config = {
     "device_id": None,
     "synchronization_param_id": None,
@@ -110,7 +141,7 @@ def get_auth_token(login: str, password: str, force_refresh: bool = False) -> Op
     global token_data
     
     # Проверяем, есть ли действительный токен (действителен 18 минут)
-    current_time = time.time()
+    current_time = clock.time()
     if not force_refresh and token_data["token"] and (current_time - token_data["timestamp"]) < 1080:
         return token_data["token"]
     
@@ -129,7 +160,7 @@ def get_auth_token(login: str, password: str, force_refresh: bool = False) -> Op
     try:
         print("[*] Получение нового токена авторизации...")
         
-        response = requests.post(
+        response = transport.post(
             auth_endpoint,
             json=auth_data,
             headers=headers,
@@ -175,7 +206,7 @@ def get_devices(token: str) -> Optional[List[Dict[str, Any]]]:
     }
     
     try:
-        response = requests.post(
+        response = transport.post(
             devices_endpoint,
             json={},
             headers=headers,
@@ -216,7 +247,7 @@ def get_device_parameters(token: str, device_id: int) -> Optional[Dict[str, Any]
     }
     
     try:
-        response = requests.post(
+        response = transport.post(
             parameters_endpoint,
             json=[],
             headers=headers,
@@ -237,18 +268,17 @@ def get_device_parameters(token: str, device_id: int) -> Optional[Dict[str, Any]
         return None
 
 
-def write_parameter(token: str, param_id: int, value: str, timeout: int = 60) -> bool:
+def write_parameters(token: str, data: List[Dict[str, Any]], timeout: int = 60) -> Optional[Dict[str, Any]]:
     """
-    Записать значение в параметр прибора.
+    Записать значения нескольких параметров прибора одним запросом.
     
     Аргументы:
         token (str): Токен авторизации
-        param_id (int): ID параметра
-        value (str): Новое значение
+        data (list): Список {"id": ID параметра, "value": значение}
         timeout (int): Таймаут записи в секундах
     
     Возвращает:
-        bool: True если запись успешна
+        dict: Ответ сервера (с writeGroupId) или None в случае ошибки
     """
     write_endpoint = f"{API_URL}/parameters/write-data"
     
@@ -258,40 +288,56 @@ def write_parameter(token: str, param_id: int, value: str, timeout: int = 60) ->
         "Content-Type": "application/json"
     }
     
-    data = {
+    # Синхронная запись: ответ с writeGroupId приходит после того, как прибор применил группу,
+    # иначе (нет связи с прибором, таймаут) - ошибка, и записи повторяются из очереди
+    payload = {
         "timeout": timeout,
         "sync": True,
-        "data": [
-            {"id": param_id, "value": str(value)}
-        ]
+        "data": [{"id": item["id"], "value": str(item["value"])} for item in data]
     }
     
     try:
-        response = requests.post(
+        response = transport.post(
             write_endpoint,
-            json=data,
+            json=payload,
             headers=headers,
-            timeout=15
+            timeout=WRITE_REQUEST_TIMEOUT
         )
         
         if response.status_code == 200:
             result = response.json()
             if "writeGroupId" in result:
-                return True
+                return result
             else:
                 print(f"[!] Неожиданный ответ при записи: {result}")
-                return False
+                return None
         elif response.status_code == 401:
             print("[!] Токен истек при записи")
-            return False
+            return None
         else:
             print(f"[!] Ошибка записи параметра: HTTP {response.status_code}")
             print(f"    Ответ: {response.text}")
-            return False
+            return None
             
     except Exception as e:
         print(f"[!] Ошибка при записи параметра: {e}")
-        return False
+        return None
+
+
+def write_parameter(token: str, param_id: int, value: str, timeout: int = 60) -> bool:
+    """
+    Записать значение в параметр прибора.
+    
+    Аргументы:
+        token (str): Токен авторизации
+        param_id (int): ID параметра
+        value (str): Новое значение
+        timeout (int): Таймаут записи в секундах
+    
+    Возвращает:
+        bool: True если запись успешна
+    """
+    return write_parameters(token, [{"id": param_id, "value": value}], timeout) is not None
 
 
 # =============================================================================
@@ -475,15 +521,20 @@ def initialize_csv():
         print(f"[!] Ошибка создания CSV файла: {e}")
 
 
-def save_to_csv(parameters_data: Dict[int, Any]):
+def save_to_csv(parameters_data: Dict[int, Any], current_time: Optional[float] = None) -> float:
     """
     Сохранить данные параметров в CSV файл.
     
     Аргументы:
         parameters_data (dict): Словарь {param_id: value}
+        current_time (float): Время строки (по умолчанию - текущее)
+    
+    Возвращает:
+        float: Время, записанное в строку (timestamp)
     """
-    current_time = time.time()
-    current_datetime = datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+    if current_time is None:
+        current_time = clock.time()
+    current_datetime = datetime.fromtimestamp(current_time).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
     
     row = [current_time, current_datetime]
     
@@ -499,6 +550,30 @@ def save_to_csv(parameters_data: Dict[int, Any]):
         print(f"[+] Данные записаны в CSV: {current_datetime}")
     except Exception as e:
         print(f"[!] Ошибка записи в CSV: {e}")
+    
+    return current_time
+
+
+def save_sample(parameters_data: Dict[int, Any], sparse_recorder: Optional[SparseRecorder] = None) -> float:
+    """
+    Сохранить строку измерений в режиме RECORDING_MODE.
+    
+    Аргументы:
+        parameters_data (dict): Словарь {param_id: value}
+        sparse_recorder (SparseRecorder): Разреженная запись (для режимов "sparse" и "both")
+    
+    Возвращает:
+        float: Время строки (timestamp)
+    """
+    current_time = clock.time()
+    
+    if RECORDING_MODE in ("csv", "both"):
+        save_to_csv(parameters_data, current_time)
+    
+    if sparse_recorder and sparse_recorder.append(current_time, parameters_data, device_config["parameter_ids"]):
+        print(f"[+] Изменения записаны в {sparse_recorder.filename}")
+    
+    return current_time
 
 
 # =============================================================================
@@ -530,10 +605,13 @@ def get_current_parameters(token: str) -> Optional[Dict[int, Any]]:
     return result
 
 
-def synchronization_loop():
+def synchronization_loop(max_duration: Optional[float] = None):
     """
     Основной цикл синхронизации.
     Отслеживает изменения параметра synchronization и записывает данные при обновлении.
+    
+    Аргументы:
+        max_duration (float): Остановиться через указанное время (по часам clock), None - работать бесконечно
     """
     print("\n" + "=" * 80)
     print(">>> ЗАПУСК ЦИКЛА СИНХРОНИЗАЦИИ <<<")
@@ -567,8 +645,30 @@ def synchronization_loop():
         print(f"[!] Ошибка при проверке конфига: {e}")
         refresh_device_config(token)
     
+    # Режим записи хранится в конфиге: по нему веб-интерфейс выбирает файл данных
+    if device_config.get("recording_mode") != RECORDING_MODE:
+        device_config["recording_mode"] = RECORDING_MODE
+        save_config()
+    
     # Инициализируем CSV файл
-    initialize_csv()
+    if RECORDING_MODE in ("csv", "both"):
+        initialize_csv()
+    
+    sparse_recorder = None
+    if RECORDING_MODE in ("sparse", "both"):
+        sparse_recorder = SparseRecorder(SPARSE_FILENAME, device_config["parameter_ids"], SPARSE_KEYFRAME_INTERVAL)
+    
+    # Буфер последних измерений в разделяемой памяти (для веб-интерфейса)
+    sample_ring = open_ring_buffer(device_config["parameter_ids"], RING_BUFFER_CAPACITY, RING_BUFFER_NAME)
+    
+    # Очередь записи параметров (уставки от оператора и синхронизатора)
+    write_queue = WriteQueue()
+    
+    # Правила оповещений проверяются в фоновом потоке, цикл только передает строки
+    alert_engine = load_alert_engine(device_config["parameter_names"], clock, ALERTS_FILENAME,
+                                     (SYNC_CYCLE_MIN + SYNC_CYCLE_MAX) / 2)
+    if alert_engine:
+        alert_engine.start()
     
     # Получаем текущее значение indicator_of_new_cycle из облака
     current_indicator_value = get_initial_indicator_value(token)
@@ -577,7 +677,11 @@ def synchronization_loop():
     # Переменные для отслеживания синхронизации
     last_sync_value = None
     last_update_time = None
+    last_update_mono = None
     cycle_times = []
+    # Отправка/получение последнего опроса, который видел текущее (старое) значение
+    last_poll_sent = None
+    last_poll_recv = None
     
     print(f"\n[*] Начинаем мониторинг параметра synchronization (ID: {device_config['synchronization_param_id']})")
     print(f"[*] Параметр indicator_of_new_cycle (ID: {device_config['indicator_param_id']})")
@@ -587,24 +691,31 @@ def synchronization_loop():
     
     consecutive_errors = 0
     max_consecutive_errors = 5
+    loop_started = clock.time()
+    
+    # Опросы по расписанию на монотонных часах, медленные ответы в активном окне хеджируются
+    scheduler = PollScheduler(clock)
+    poller = HedgedPoller(clock, percentile=HEDGE_PERCENTILE, max_hedges=HEDGE_MAX_EXTRA)
     
     while True:
         try:
-            # Определяем интервал опроса в зависимости от времени с последнего обновления
-            if last_update_time:
-                time_since_update = time.time() - last_update_time
-                
-                # Если находимся в активном окне ожидания обновления, опрашиваем часто
-                if ACTIVE_WINDOW_START <= time_since_update <= ACTIVE_WINDOW_END:
-                    poll_interval = POLL_INTERVAL_ACTIVE
-                else:
-                    poll_interval = POLL_INTERVAL_IDLE
-            else:
-                # Первоначально опрашиваем часто до первого обновления
-                poll_interval = POLL_INTERVAL_ACTIVE
+            if max_duration is not None and clock.time() - loop_started >= max_duration:
+                print("[*] Достигнута заданная длительность работы")
+                break
+            
+            # Ждем следующего опроса по расписанию: в активном окне ожидания обновления -
+            # часто и с фиксированной фазой от начала окна, вне окна - редко.
+            # До первого обновления окно неизвестно, опрашиваем часто.
+            window = None
+            if last_update_mono is not None:
+                window = (last_update_mono + ACTIVE_WINDOW_START, last_update_mono + ACTIVE_WINDOW_END)
+            poll_interval = scheduler.wait(POLL_INTERVAL_ACTIVE, POLL_INTERVAL_IDLE, window)
             
-            # Получаем текущие параметры
-            parameters = get_current_parameters(token)
+            # Получаем текущие параметры; для трассировки - отправка и получение того запроса
+            # (основного или дублирующего), чей ответ использован
+            parameters = poller.call(lambda: get_current_parameters(token),
+                                     hedge=poll_interval == POLL_INTERVAL_ACTIVE)
+            poll_sent, poll_recv = poller.last_sent, poller.last_recv
             
             if not parameters:
                 consecutive_errors += 1
@@ -615,7 +726,6 @@ def synchronization_loop():
                         print("[!] Не удалось обновить токен. Завершение.")
                         break
                     consecutive_errors = 0
-                time.sleep(poll_interval)
                 continue
             
             consecutive_errors = 0
@@ -634,11 +744,11 @@ def synchronization_loop():
                          consecutive_errors = 0
                          # Пробуем сразу получить данные с новым конфигом
                          print("[*] Повторная попытка чтения данных с новой конфигурацией...")
+                         scheduler.reset()
                          continue
                      else:
                          print("[!] Не удалось обновить конфигурацию.")
                 
-                time.sleep(poll_interval)
                 continue
             
             # Преобразуем в число для сравнения
@@ -646,12 +756,11 @@ def synchronization_loop():
                 sync_value_num = float(sync_value)
             except (ValueError, TypeError):
                 print(f"[!] Некорректное значение synchronization: {sync_value}")
-                time.sleep(poll_interval)
                 continue
             
             # Проверяем, изменилось ли значение
             if last_sync_value is not None and sync_value_num != last_sync_value:
-                current_time = time.time()
+                current_time = clock.time()
                 
                 print(f"\n[!] ОБНОВЛЕНИЕ ДАННЫХ ОБНАРУЖЕНО!")
                 print(f"    Значение synchronization: {last_sync_value} → {sync_value_num}")
@@ -670,7 +779,6 @@ def synchronization_loop():
                          # Нет, если мы считаем это шумом, мы должны ждать пока не пройдет время.
                          # Но если значение реально поменялось и стоит, мы должны его принять, но только если прошло время.
                          # Так что просто пропускаем иттерацию
-                         time.sleep(poll_interval)
                          continue
                 
                 # Рассчитываем время цикла
@@ -687,6 +795,7 @@ def synchronization_loop():
                     print(f"    Разброс циклов: {min(cycle_times):.2f} - {max(cycle_times):.2f} сек")
                 
                 last_update_time = current_time
+                last_update_mono = clock.monotonic()
                 
                 # ВАЖНО: Сначала записываем indicator_of_new_cycle в прибор
                 # ЖЕСТКОЕ ЧЕРЕДОВАНИЕ: 0 -> 1 -> 0 -> 1
@@ -697,13 +806,28 @@ def synchronization_loop():
                 
                 print(f"[*] Записываем indicator_of_new_cycle: {current_indicator_value} → {new_indicator_value}")
                 
-                write_success = write_parameter(token, device_config["indicator_param_id"], new_indicator_value)
+                # Ожидающие записи из очереди уходят тем же запросом, без лишнего обращения к API
+                write_requested = clock.time()
+                write_queue.drain_spool()
+                batched_writes = len(write_queue)
+                write_result = write_queue.flush(
+                    lambda data: write_parameters(token, data),
+                    priority=[{"id": device_config["indicator_param_id"], "value": new_indicator_value}],
+                    now=write_requested
+                )
+                write_success = write_result is not None
+                if not write_success and batched_writes:
+                    # Пакет мог быть отклонен из-за уставки - indicator_of_new_cycle записываем отдельно,
+                    # а уставки вернулись в очередь и уйдут со следующей отправкой
+                    print(f"[!] Пакетная запись не выполнена, повторяем запись indicator_of_new_cycle отдельно")
+                    write_success = write_parameter(token, device_config["indicator_param_id"], new_indicator_value)
+                write_acked = clock.time()
                 
                 if write_success:
                     print(f"[+] Параметр indicator_of_new_cycle успешно записан!")
                     
                     # Рассчитываем задержку записи
-                    write_time = time.time()
+                    write_time = clock.time()
                     delay = write_time - current_time
                     print(f"[+] Задержка записи: {delay:.3f} сек")
                     
@@ -716,8 +840,29 @@ def synchronization_loop():
                     print(f"[!] Ошибка записи параметра indicator_of_new_cycle")
                     print(f"[!] В CSV будет записано старое значение из облака")
                 
-                # Сохраняем данные в CSV (с обновленным значением индикатора если запись успешна)
-                save_to_csv(parameters)
+                # Сохраняем данные (с обновленным значением индикатора если запись успешна)
+                row_time = save_sample(parameters, sparse_recorder)
+                committed = clock.time()
+                if sample_ring:
+                    sample_ring.publish(row_time, parameters)
+                if alert_engine:
+                    alert_engine.submit(row_time, parameters,
+                                        sum(cycle_times) / len(cycle_times) if cycle_times else None)
+                
+                # Сохраняем трассировку цикла: опросы до/после изменения, запись и сохранение
+                if last_poll_sent is not None:
+                    record_cycle_trace({
+                        "old_sent": last_poll_sent,
+                        "old_recv": last_poll_recv,
+                        "new_sent": poll_sent,
+                        "new_recv": poll_recv,
+                        "write_req": write_requested,
+                        "write_ack": write_acked,
+                        "commit": committed,
+                        "sync_old": last_sync_value,
+                        "sync_new": sync_value_num,
+                        "write_ok": write_success
+                    })
                 
                 # Вычисляем и выводим информацию о следующем ожидаемом обновлении
                 if cycle_times:
@@ -726,12 +871,18 @@ def synchronization_loop():
                     print(f"[*] Ожидание следующего обновления (примерно {avg_cycle:.0f}±{max(cycle_times)-min(cycle_times):.0f} сек)...\n")
                 else:
                     print(f"[*] Ожидание следующего обновления...\n")
+                
+                hedge_stats = poller.stats()
+                print(f"[*] Опросов: {hedge_stats['polls']}, дублирующих запросов: {hedge_stats['hedges']} "
+                      f"(+{hedge_stats['extra_request_ratio'] * 100:.1f}%), пропущено слотов: {scheduler.skipped_slots}")
             
             last_sync_value = sync_value_num
+            last_poll_sent = poll_sent
+            last_poll_recv = poll_recv
             
             # Выводим статус (не слишком часто)
             if last_update_time:
-                time_since_update = time.time() - last_update_time
+                time_since_update = clock.time() - last_update_time
                 # Выводим статус каждые 10 секунд, если находимся в пассивном режиме
                 if int(time_since_update) % 10 == 0 and poll_interval == POLL_INTERVAL_IDLE:
                     in_active_window = ACTIVE_WINDOW_START <= time_since_update <= ACTIVE_WINDOW_END
@@ -740,7 +891,14 @@ def synchronization_loop():
             else:
                 print(f"[*] Инициализация... (sync={sync_value_num})")
             
-            time.sleep(poll_interval)
+            # Вне активного окна отправляем накопленные записи отдельным запросом
+            if last_update_time and poll_interval == POLL_INTERVAL_IDLE:
+                time_since_update = clock.time() - last_update_time
+                if time_since_update < ACTIVE_WINDOW_START - WRITE_FLUSH_MARGIN or time_since_update > ACTIVE_WINDOW_END:
+                    write_queue.drain_spool()
+                    if len(write_queue):
+                        print(f"[*] Отправка очереди записи: {len(write_queue)} параметр(ов)")
+                        write_queue.flush(lambda data: write_parameters(token, data), now=clock.time())
             
         except KeyboardInterrupt:
             print("\n\n[*] Получен сигнал остановки (Ctrl+C)")
@@ -750,7 +908,18 @@ def synchronization_loop():
             print(f"\n[!] Неожиданная ошибка: {e}")
             import traceback
             traceback.print_exc()
-            time.sleep(5)
+            clock.sleep(5)
+    
+    if sample_ring:
+        sample_ring.close()
+    
+    if alert_engine:
+        alert_engine.stop()
+    
+    poller.close()
+    poll_stats.clear()
+    poll_stats.update(poller.stats())
+    poll_stats["skipped_slots"] = scheduler.skipped_slots
     
     print("\n" + "=" * 80)
     print("[+] ПРОГРАММА ЗАВЕРШЕНА")
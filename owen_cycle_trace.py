@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Трассировка задержек цикла синхронизации.
+Для каждого обнаруженного обновления сохраняет временную шкалу
+"обнаружение → запись → сохранение" в компактный CSV файл.
+"""
+
+import csv
+import os
+from datetime import datetime
+from typing import Optional, Dict, List, Any
+
+
+# Файл трассировки циклов
+TRACE_FILENAME = "owen_cycle_trace.csv"
+
+# Смещения (мс) хранятся относительно оценки момента реального изменения
+OFFSET_FIELDS = ["old_sent", "old_recv", "new_sent", "new_recv", "write_req", "write_ack", "commit"]
+TRACE_HEADERS = ["change_est"] + OFFSET_FIELDS + ["sync_old", "sync_new", "write_ok"]
+
+
+def estimate_change_time(old_sent: float, old_recv: float, new_sent: float, new_recv: float) -> float:
+    """
+    Оценить момент реального изменения значения в облаке.
+    Снимок данных каждого опроса сделан где-то между отправкой и получением,
+    поэтому берем середину каждого опроса, а изменение - посередине между ними.
+
+    Аргументы:
+        old_sent (float): Отправка последнего опроса со старым значением
+        old_recv (float): Получение последнего опроса со старым значением
+        new_sent (float): Отправка первого опроса с новым значением
+        new_recv (float): Получение первого опроса с новым значением
+
+    Возвращает:
+        float: Оценка времени изменения (unix time)
+    """
+    old_mid = (old_sent + old_recv) / 2
+    new_mid = (new_sent + new_recv) / 2
+    return (old_mid + new_mid) / 2
+
+
+def record_cycle_trace(trace: Dict[str, Any], filename: str = TRACE_FILENAME) -> bool:
+    """
+    Дописать трассировку одного цикла в файл.
+
+    Аргументы:
+        trace (dict): Абсолютные отметки времени (ключи OFFSET_FIELDS),
+                      а также sync_old, sync_new и write_ok
+        filename (str): Файл трассировки
+
+    Возвращает:
+        bool: True если запись успешна
+    """
+    change_est = estimate_change_time(
+        trace["old_sent"], trace["old_recv"], trace["new_sent"], trace["new_recv"]
+    )
+
+    row = [f"{change_est:.3f}"]
+    for field in OFFSET_FIELDS:
+        value = trace.get(field)
+        row.append("" if value is None else f"{(value - change_est) * 1000:.0f}")
+    row += [trace.get("sync_old"), trace.get("sync_new"), 1 if trace.get("write_ok") else 0]
+
+    try:
+        is_new = not os.path.exists(filename)
+        with open(filename, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if is_new:
+                writer.writerow(TRACE_HEADERS)
+            writer.writerow(row)
+        return True
+    except Exception as e:
+        print(f"[!] Ошибка записи трассировки: {e}")
+        return False
+
+
+def read_tail_lines(path: str, count: int, block_size: int = 65536) -> List[str]:
+    """Прочитать последние count полных строк файла, не читая его целиком."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        while pos > 0 and data.count(b'\n') <= count:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+    lines = data.split(b'\n')
+    # Последний элемент - недописанная строка (или пустой после \n)
+    lines.pop()
+    # Первая строка блока может быть обрезана
+    if pos > 0 and lines:
+        lines.pop(0)
+    return [line.decode('utf-8', errors='replace') for line in lines[-count:] if line]
+
+
+def _span(row: Dict[str, Any], start: str, end: str) -> Optional[float]:
+    """Длительность между двумя отметками в мс (или None)."""
+    if row.get(start) is None or row.get(end) is None:
+        return None
+    return row[end] - row[start]
+
+
+def load_cycle_traces(limit: int = 50, filename: str = TRACE_FILENAME) -> List[Dict[str, Any]]:
+    """
+    Прочитать последние трассировки циклов.
+
+    Аргументы:
+        limit (int): Максимальное количество циклов
+        filename (str): Файл трассировки
+
+    Возвращает:
+        list: Список словарей (новые сверху) со смещениями в мс и рассчитанными отрезками:
+              staleness - от изменения до получения нового значения,
+              uncertainty - ширина интервала, в котором произошло изменение,
+              detect_to_write - от получения ответа до отправки записи,
+              write_rtt - запись indicator_of_new_cycle,
+              persist - сохранение данных после подтверждения записи,
+              total - от изменения до сохранения
+    """
+    if not os.path.exists(filename):
+        return []
+
+    rows = []
+    try:
+        # Читаем только конец файла: время загрузки не растет с историей
+        lines = [line for line in read_tail_lines(filename, limit) if not line.startswith("change_est,")]
+        for raw in csv.DictReader(lines, fieldnames=TRACE_HEADERS):
+            row = {"change_est": float(raw["change_est"])}
+            for field in OFFSET_FIELDS:
+                row[field] = float(raw[field]) if raw.get(field) else None
+            row["sync_old"] = raw.get("sync_old")
+            row["sync_new"] = raw.get("sync_new")
+            row["write_ok"] = raw.get("write_ok") == "1"
+            rows.append(row)
+    except Exception as e:
+        print(f"[!] Ошибка чтения трассировки: {e}")
+        return []
+
+    for row in rows:
+        row["change_datetime"] = datetime.fromtimestamp(row["change_est"]).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        row["staleness"] = row["new_recv"]
+        row["uncertainty"] = (row["new_sent"] + row["new_recv"] - row["old_sent"] - row["old_recv"]) / 2
+        row["detect_to_write"] = _span(row, "new_recv", "write_req")
+        row["write_rtt"] = _span(row, "write_req", "write_ack")
+        row["persist"] = _span(row, "write_ack", "commit")
+        row["total"] = row["commit"]
+
+    return list(reversed(rows))
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Расписание опросов и хеджирование медленных запросов.
+
+PollScheduler выдает опросы по дедлайнам на clock.monotonic(): в активном окне
+опросы идут с фиксированной фазой от начала окна, поэтому период не зависит от
+времени ответа и не накапливает дрейф.
+
+HedgedPoller выполняет опрос и, если ответ задерживается дольше заданного
+перцентиля недавних RTT, отправляет параллельный (хеджирующий) запрос и берет
+первый успешный ответ.
+"""
+
+import math
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, Dict, Any, Tuple
+
+
+class PollScheduler:
+    """Расписание опросов по дедлайнам."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.last_deadline = None
+        # Номер слота последнего опроса в активном окне (целый, чтобы не накапливать ошибку округления)
+        self.window_start = None
+        self.slot = None
+        self.skipped_slots = 0
+
+    def reset(self):
+        """Следующий опрос - немедленно."""
+        self.last_deadline = None
+        self.slot = None
+
+    def _next_deadline(self, now: float, active_period: float, idle_period: float,
+                       window: Optional[Tuple[float, float]]) -> Tuple[float, float, Optional[int]]:
+        last = self.last_deadline
+        if last is None:
+            return now, active_period, None
+        if window is None:
+            return last + active_period, active_period, None
+
+        window_start, window_end = window
+        if self.slot is not None and self.window_start == window_start:
+            slot = self.slot + 1
+        elif last < window_start:
+            # Вне окна опрашиваем редко, но первый опрос окна - точно в его начале
+            deadline = min(last + idle_period, window_start)
+            if deadline == window_start:
+                return deadline, active_period, 0
+            return deadline, idle_period, None
+        else:
+            # Окно стало известно, когда опросы уже в нем: ближайший слот после последнего опроса
+            slot = math.floor((last - window_start) / active_period + 1e-9) + 1
+
+        deadline = window_start + slot * active_period
+        if deadline <= window_end:
+            return deadline, active_period, slot
+        return max(last + idle_period, window_end), idle_period, None
+
+    def wait(self, active_period: float, idle_period: float,
+             window: Optional[Tuple[float, float]] = None) -> float:
+        """
+        Дождаться следующего опроса.
+
+        Аргументы:
+            active_period (float): Период опроса в активном окне (и до первого обновления)
+            idle_period (float): Период опроса вне активного окна
+            window (tuple): Активное окно (начало, конец) по clock.monotonic(), None - окно не известно
+
+        Возвращает:
+            float: Период, по которому выполняется этот опрос
+        """
+        now = self.clock.monotonic()
+        deadline, period, slot = self._next_deadline(now, active_period, idle_period, window)
+
+        if deadline < now:
+            # Опоздали (долгий ответ) - пропускаем прошедшие слоты, сохраняя фазу
+            missed = math.ceil((now - deadline) / period)
+            self.skipped_slots += missed
+            if slot is not None:
+                slot += missed
+                deadline = window[0] + slot * period
+            else:
+                deadline += missed * period
+
+        self.clock.sleep(deadline - now)
+        self.last_deadline = deadline
+        self.slot = slot
+        self.window_start = window[0] if slot is not None else None
+        return period
+
+
+class HedgedPoller:
+    """Выполнение опросов с хеджированием по перцентилю RTT."""
+
+    def __init__(self, clock, percentile: float = 0.9, min_samples: int = 20,
+                 max_hedges: int = 1, history: int = 200):
+        """
+        Аргументы:
+            clock: Часы синхронизатора
+            percentile (float): Перцентиль RTT, после которого отправляется хеджирующий запрос
+            min_samples (int): Минимум измерений RTT до включения хеджирования
+            max_hedges (int): Максимум дополнительных запросов на один опрос
+            history (int): Количество учитываемых последних RTT
+        """
+        self.clock = clock
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.max_hedges = max_hedges
+        self.rtts = deque(maxlen=history)
+        self.executor = ThreadPoolExecutor(max_workers=max_hedges + 2, thread_name_prefix="poll")
+        self.polls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        # Отправка и получение запроса, чей ответ вернул последний call() (для трассировки циклов)
+        self.last_sent = None
+        self.last_recv = None
+
+    def threshold(self) -> Optional[float]:
+        """Порог хеджирования (сек) или None, если измерений пока мало."""
+        if len(self.rtts) < self.min_samples:
+            return None
+        ordered = sorted(self.rtts)
+        return ordered[min(len(ordered) - 1, int(self.percentile * len(ordered)))]
+
+    def _timed(self, fn: Callable[[], Any]) -> Tuple[Any, float, float]:
+        sent = self.clock.time()
+        started = self.clock.monotonic()
+        result = fn()
+        self.rtts.append(self.clock.monotonic() - started)
+        return result, sent, self.clock.time()
+
+    def _take(self, timed: Tuple[Any, float, float]) -> Any:
+        result, self.last_sent, self.last_recv = timed
+        return result
+
+    def call(self, fn: Callable[[], Any], hedge: bool = True) -> Any:
+        """
+        Выполнить опрос.
+
+        Аргументы:
+            fn: Функция опроса (None - ошибка)
+            hedge (bool): Разрешить хеджирующие запросы
+
+        Возвращает:
+            Результат первого успешного запроса или None
+            (время его отправки и получения - в last_sent и last_recv)
+        """
+        self.polls += 1
+        threshold = self.threshold() if hedge else None
+        if threshold is None:
+            return self._take(self._timed(fn))
+
+        futures = [self.executor.submit(self._timed, fn)]
+        pending = set(futures)
+        while pending:
+            timeout = threshold if len(futures) <= self.max_hedges else None
+            done, pending = self.clock.wait(pending, timeout)
+            for future in done:
+                result = self._take(future.result())
+                if result is not None:
+                    if future is not futures[0]:
+                        self.hedge_wins += 1
+                    return result
+            if not done and len(futures) <= self.max_hedges:
+                # Ответ задерживается - отправляем параллельный запрос
+                self.hedges += 1
+                hedge_future = self.executor.submit(self._timed, fn)
+                futures.append(hedge_future)
+                pending.add(hedge_future)
+        return None
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика хеджирования: опросы, дополнительные запросы и их доля."""
+        return {
+            "polls": self.polls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "extra_request_ratio": self.hedges / self.polls if self.polls else 0.0,
+            "threshold": self.threshold()
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кольцевой буфер последних измерений в разделяемой памяти.
+Синхронизатор публикует каждую записанную строку, веб-интерфейс читает последние
+строки без обращения к диску и разбора CSV.
+
+Раскладка сегмента:
+    заголовок  - magic, версия, емкость, число параметров, счетчик записей, PID писателя
+    ID параметров (uint64 * n)
+    слоты      - seq (uint64), timestamp (float64), значения (float64 * n)
+
+Согласованность - seqlock на каждый слот: перед записью i-й строки seq = 2*i+1,
+после записи seq = 2*i+2. Читатель принимает слот, только если seq до и после
+копирования равен 2*i+2, поэтому недописанные или перезаписанные строки не видны.
+
+Писатель у сегмента один: сегмент, чей писатель (PID в заголовке) еще работает,
+не подхватывается и не удаляется другим процессом.
+"""
+
+import math
+import os
+import struct
+import sys
+from multiprocessing import shared_memory, resource_tracker
+from typing import Optional, Dict, List, Any, Tuple
+
+
+SHM_NAME = "owen_samples"
+DEFAULT_CAPACITY = 10000
+
+MAGIC = b"OWRB"
+VERSION = 2
+# magic, version, capacity, n_params, head (всего записано строк), PID писателя
+HEADER = struct.Struct("<4sIIIQQ")
+SEQ = struct.Struct("<Q")
+HEAD_OFFSET = 16
+PID_OFFSET = 24
+
+
+def _layout(capacity: int, n_params: int) -> Tuple[int, struct.Struct, int]:
+    """Смещение первого слота, формат данных слота и полный размер сегмента."""
+    slots_offset = HEADER.size + 8 * n_params
+    record = struct.Struct(f"<d{n_params}d")
+    slot_size = SEQ.size + record.size
+    return slots_offset, record, slots_offset + slot_size * capacity
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Подключиться к существующему сегменту, не передавая его resource_tracker этого процесса."""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    shm = shared_memory.SharedMemory(name=name)
+    # Иначе при завершении читателя сегмент будет удален вместе с данными синхронизатора
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+def _track(shm: shared_memory.SharedMemory):
+    """Вернуть сегмент под учет resource_tracker (писатель становится его владельцем)."""
+    if sys.version_info < (3, 13):
+        resource_tracker.register(shm._name, "shared_memory")
+
+
+def _pid_alive(pid: int) -> bool:
+    """Работает ли процесс с этим PID."""
+    if pid == os.getpid():
+        return False
+    if sys.platform == 'win32':
+        # На Windows os.kill завершает процесс, а сегмент существует, только пока его держит живой процесс
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+class RingBufferWriter:
+    """Писатель кольцевого буфера (один на сегмент - синхронизатор)."""
+
+    def __init__(self, param_ids: List[int], capacity: int = DEFAULT_CAPACITY, name: str = SHM_NAME):
+        """
+        Аргументы:
+            param_ids (list): ID параметров в порядке записи
+            capacity (int): Количество хранимых строк
+            name (str): Имя сегмента разделяемой памяти
+        """
+        self.param_ids = list(param_ids)
+        self.capacity = capacity
+        self.name = name
+        self.slots_offset, self.record, size = _layout(capacity, len(self.param_ids))
+        self.slot_size = SEQ.size + self.record.size
+
+        self.shm = self._open_existing(size)
+        if self.shm is None:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            buf = self.shm.buf
+            buf[:size] = bytes(size)
+            HEADER.pack_into(buf, 0, MAGIC, VERSION, capacity, len(self.param_ids), 0, 0)
+            struct.pack_into(f"<{len(self.param_ids)}Q", buf, HEADER.size, *self.param_ids)
+        struct.pack_into("<Q", self.shm.buf, PID_OFFSET, os.getpid())
+        self.head = HEADER.unpack_from(self.shm.buf, 0)[4]
+
+    def _open_existing(self, size: int) -> Optional[shared_memory.SharedMemory]:
+        """Продолжить запись в сегмент после перезапуска, если раскладка не изменилась."""
+        # Подключаемся без учета: сегмент чужого живого писателя не должен быть удален при нашем выходе
+        try:
+            shm = _attach(self.name)
+        except FileNotFoundError:
+            return None
+
+        magic, version, capacity, n_params, _, pid = HEADER.unpack_from(shm.buf, 0)
+        if magic == MAGIC and version == VERSION and pid and _pid_alive(pid):
+            shm.close()
+            raise RuntimeError(f"сегмент {self.name} используется процессом {pid}")
+
+        if (magic == MAGIC and version == VERSION and capacity == self.capacity
+                and n_params == len(self.param_ids) and shm.size >= size
+                and list(struct.unpack_from(f"<{n_params}Q", shm.buf, HEADER.size)) == self.param_ids):
+            _track(shm)
+            return shm
+
+        print(f"[*] Раскладка буфера {self.name} изменилась, создаем заново")
+        _track(shm)
+        shm.close()
+        shm.unlink()
+        return None
+
+    def publish(self, timestamp: float, parameters_data: Dict[int, Any]):
+        """
+        Опубликовать строку измерений.
+
+        Аргументы:
+            timestamp (float): Время записи строки
+            parameters_data (dict): Словарь {param_id: value}
+        """
+        index = self.head
+        offset = self.slots_offset + (index % self.capacity) * self.slot_size
+        values = [_to_float(parameters_data.get(param_id)) for param_id in self.param_ids]
+
+        buf = self.shm.buf
+        SEQ.pack_into(buf, offset, 2 * index + 1)
+        self.record.pack_into(buf, offset + SEQ.size, timestamp, *values)
+        SEQ.pack_into(buf, offset, 2 * index + 2)
+
+        self.head = index + 1
+        struct.pack_into("<Q", buf, HEAD_OFFSET, self.head)
+
+    def close(self):
+        """Закрыть и удалить сегмент (при остановке синхронизатора)."""
+        owner = struct.unpack_from("<Q", self.shm.buf, PID_OFFSET)[0]
+        self.shm.close()
+        if owner == os.getpid():
+            self.shm.unlink()
+
+
+def open_writer(param_ids: List[int], capacity: int = DEFAULT_CAPACITY,
+                name: Optional[str] = SHM_NAME) -> Optional[RingBufferWriter]:
+    """Создать писателя или вернуть None, если буфер выключен (name=None), занят или недоступен."""
+    if not name:
+        return None
+    try:
+        writer = RingBufferWriter(param_ids, capacity, name)
+        print(f"[+] Буфер последних измерений: {name} ({capacity} строк)")
+        return writer
+    except Exception as e:
+        print(f"[!] Буфер в разделяемой памяти недоступен: {e}")
+        return None
+
+
+def read_recent(limit: int, name: str = SHM_NAME,
+                retries: int = 3) -> Optional[Tuple[List[int], List[Tuple[float, List[float]]]]]:
+    """
+    Прочитать последние строки из буфера.
+
+    Аргументы:
+        limit (int): Максимальное количество строк
+        name (str): Имя сегмента разделяемой памяти
+        retries (int): Число повторных попыток чтения слота, который перезаписывается
+
+    Возвращает:
+        tuple: (ID параметров, [(timestamp, [значения])] в хронологическом порядке)
+               или None, если буфер не создан
+    """
+    try:
+        shm = _attach(name)
+    except (FileNotFoundError, OSError):
+        return None
+
+    try:
+        buf = shm.buf
+        magic, version, capacity, n_params, head, _ = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        param_ids = list(struct.unpack_from(f"<{n_params}Q", buf, HEADER.size))
+        slots_offset, record, _ = _layout(capacity, n_params)
+        slot_size = SEQ.size + record.size
+
+        rows = []
+        for index in range(max(0, head - min(limit, capacity)), head):
+            offset = slots_offset + (index % capacity) * slot_size
+            expected = 2 * index + 2
+            for _ in range(retries):
+                seq = SEQ.unpack_from(buf, offset)[0]
+                if seq == expected - 1:
+                    # Слот прямо сейчас записывается - пробуем еще раз
+                    continue
+                if seq != expected:
+                    # Слот уже перезаписан более новой строкой
+                    break
+                data = record.unpack_from(buf, offset + SEQ.size)
+                if SEQ.unpack_from(buf, offset)[0] == expected:
+                    rows.append((data[0], list(data[1:])))
+                    break
+        return param_ids, rows
+    finally:
+        shm.close()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Разреженная запись измерений: сохраняются только изменившиеся каналы.
+
+Формат файла (текстовый, строки в формате CSV):
+    #owen-sparse 1,<ID>,<ID>,...    - раскладка каналов (в начале и при ее изменении)
+    K,<время мс>,<v1>,...,<vn>      - ключевой кадр: все значения
+    D,<dt мс>,<пропуск>:<v>,...     - изменения относительно предыдущей строки
+
+В строке D время хранится как приращение в миллисекундах, для каждого изменившегося
+канала - число пропущенных неизменных каналов перед ним (RLE) и значение: приращение
+"+N"/"-N" для целых чисел или "=значение" для остальных. Ключевой кадр пишется
+каждые keyframe_interval строк, чтобы чтение можно было начать с него.
+
+Чтение: iter_rows() восстанавливает полные строки, read_rows() - последние строки
+в формате CSV синхронизатора, read_series() - ряд одного канала.
+
+    python owen_sparse_store.py convert owen_cloud_data.csv owen_cloud_data.sparse [--force]
+"""
+
+import csv
+import json
+import os
+import sys
+from collections import deque
+from datetime import datetime
+from typing import Optional, Iterator, Dict, List, Any, Tuple
+
+
+SPARSE_FILENAME = "owen_cloud_data.sparse"
+HEADER_PREFIX = "#owen-sparse 1"
+DEFAULT_KEYFRAME_INTERVAL = 60
+
+
+def _is_int(value: str) -> bool:
+    try:
+        return str(int(value)) == value
+    except ValueError:
+        return False
+
+
+def _encode_change(old: str, new: str) -> str:
+    if _is_int(old) and _is_int(new):
+        return f"{int(new) - int(old):+d}"
+    return "=" + new
+
+
+def _decode_change(old: str, change: str) -> str:
+    if change.startswith("="):
+        return change[1:]
+    return str(int(old) + int(change))
+
+
+def _to_text(value: Any) -> str:
+    return "" if value is None else str(value)
+
+
+class SparseRecorder:
+    """Запись измерений в разреженном формате."""
+
+    def __init__(self, filename: str = SPARSE_FILENAME, param_ids: Optional[List[int]] = None,
+                 keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL):
+        """
+        Аргументы:
+            filename (str): Файл данных
+            param_ids (list): ID параметров в порядке каналов
+            keyframe_interval (int): Ключевой кадр каждые N строк
+        """
+        self.filename = filename
+        self.param_ids = list(param_ids or [])
+        self.keyframe_interval = keyframe_interval
+        # После запуска состояние предыдущей строки неизвестно - начинаем с раскладки и ключевого кадра
+        self.layout_written = False
+        self.last_values = None
+        self.last_ms = None
+        self.rows_since_keyframe = 0
+
+    def encode(self, timestamp: float, parameters_data: Dict[int, Any],
+               param_ids: Optional[List[int]] = None) -> List[List[Any]]:
+        """
+        Закодировать строку измерений.
+
+        Аргументы:
+            timestamp (float): Время строки
+            parameters_data (dict): Словарь {param_id: value}
+            param_ids (list): Текущий состав параметров (если изменился - пишется новая раскладка)
+
+        Возвращает:
+            list: Строки файла для записи
+        """
+        lines = []
+        if param_ids is not None and list(param_ids) != self.param_ids:
+            self.param_ids = list(param_ids)
+            self.layout_written = False
+        if not self.layout_written:
+            lines.append([HEADER_PREFIX] + self.param_ids)
+            self.layout_written = True
+            self.last_values = None
+
+        ms = int(round(timestamp * 1000))
+        values = [_to_text(parameters_data.get(param_id, "N/A")) for param_id in self.param_ids]
+
+        if self.last_values is None or self.rows_since_keyframe >= self.keyframe_interval:
+            lines.append(["K", ms] + values)
+            self.rows_since_keyframe = 0
+        else:
+            line = ["D", ms - self.last_ms]
+            skip = 0
+            for old, new in zip(self.last_values, values):
+                if old == new:
+                    skip += 1
+                    continue
+                line.append(f"{skip}:{_encode_change(old, new)}")
+                skip = 0
+            lines.append(line)
+            self.rows_since_keyframe += 1
+
+        self.last_values = values
+        self.last_ms = ms
+        return lines
+
+    def append(self, timestamp: float, parameters_data: Dict[int, Any],
+               param_ids: Optional[List[int]] = None) -> bool:
+        """
+        Дописать строку измерений в файл.
+
+        Возвращает:
+            bool: True если запись успешна
+        """
+        lines = self.encode(timestamp, parameters_data, param_ids)
+        try:
+            with open(self.filename, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(lines)
+            return True
+        except Exception as e:
+            print(f"[!] Ошибка записи в разреженный файл: {e}")
+            # Следующая строка должна быть ключевым кадром, иначе приращения потеряют опору
+            self.layout_written = False
+            return False
+
+
+def iter_rows(filename: str = SPARSE_FILENAME, end: Optional[int] = None,
+              start: int = 0) -> Iterator[Tuple[float, List[int], List[str]]]:
+    """
+    Восстановить полные строки.
+
+    Аргументы:
+        filename (str): Файл данных
+        end (int): Читать не дальше этого смещения в байтах
+        start (int): Начать с этого смещения (начало ключевого кадра; ID параметров
+                     до следующей строки раскладки будут пустыми)
+
+    Возвращает:
+        iterator: (timestamp, ID параметров, значения) в порядке записи
+    """
+    param_ids = []
+    values = None
+    ms = None
+
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        offset = start
+        for raw in f:
+            offset += len(raw)
+            # Недописанная строка (или граница снимка) - останавливаемся
+            if not raw.endswith(b"\n") or (end is not None and offset > end):
+                break
+            line = next(csv.reader([raw.decode('utf-8')]), None)
+            if not line:
+                continue
+            kind = line[0]
+
+            if kind == HEADER_PREFIX:
+                param_ids = [int(param_id) for param_id in line[1:]]
+                values = None
+                continue
+            elif kind == "K":
+                ms = int(line[1])
+                values = line[2:]
+            elif kind == "D":
+                if values is None:
+                    # Приращение без ключевого кадра (файл обрезан) - ждем следующий кадр
+                    continue
+                ms += int(line[1])
+                values = list(values)
+                index = -1
+                for entry in line[2:]:
+                    skip, change = entry.split(":", 1)
+                    index += int(skip) + 1
+                    values[index] = _decode_change(values[index], change)
+            else:
+                continue
+
+            yield ms / 1000, param_ids, values
+
+
+def find_tail_keyframe(filename: str, limit: int, block_size: int = 65536) -> int:
+    """
+    Смещение ключевого кадра, начиная с которого восстанавливаются последние limit строк.
+    Файл читается блоками с конца, поэтому время не зависит от длины истории.
+    """
+    with open(filename, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b''
+        while pos > 0:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+
+            # Первая строка блока может быть обрезана - ее не учитываем, пока не дочитаем
+            first = data.find(b'\n') + 1 if pos > 0 else 0
+            rows = 0
+            end = len(data)
+            while end > first:
+                line_start = data.rfind(b'\n', first, end - 1) + 1
+                line_start = max(line_start, first)
+                line = data[line_start:end]
+                if line.startswith((b'K,', b'D,')):
+                    rows += 1
+                if rows >= limit and line.startswith(b'K,'):
+                    return pos + line_start
+                end = line_start
+    return 0
+
+
+def read_rows(filename: str = SPARSE_FILENAME, limit: Optional[int] = None) -> List[List[str]]:
+    """
+    Последние строки в формате CSV синхронизатора: timestamp, datetime, значения.
+
+    Аргументы:
+        filename (str): Файл данных
+        limit (int): Количество последних строк (None - все)
+
+    Возвращает:
+        list: Строки в хронологическом порядке
+    """
+    rows = deque(maxlen=limit)
+    start = find_tail_keyframe(filename, limit) if limit else 0
+    for timestamp, _, values in iter_rows(filename, start=start):
+        rows.append((timestamp, values))
+    return [
+        [repr(timestamp), datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]] + values
+        for timestamp, values in rows
+    ]
+
+
+def read_series(param_id: int, filename: str = SPARSE_FILENAME,
+                changes_only: bool = False) -> List[Tuple[float, str]]:
+    """
+    Ряд значений одного канала.
+
+    Аргументы:
+        param_id (int): ID параметра
+        filename (str): Файл данных
+        changes_only (bool): Только точки, в которых значение изменилось
+
+    Возвращает:
+        list: [(timestamp, value)]
+    """
+    series = []
+    last = None
+    for timestamp, param_ids, values in iter_rows(filename):
+        if param_id not in param_ids:
+            continue
+        value = values[param_ids.index(param_id)]
+        if changes_only and value == last:
+            continue
+        series.append((timestamp, value))
+        last = value
+    return series
+
+
+def convert_csv(csv_filename: str, sparse_filename: str, param_ids: List[int],
+                keyframe_interval: int = DEFAULT_KEYFRAME_INTERVAL, force: bool = False) -> int:
+    """
+    Преобразовать CSV синхронизатора в разреженный формат.
+    Результат пишется потоком во временный файл и заменяет целевой только целиком.
+
+    Аргументы:
+        csv_filename (str): Исходный CSV
+        sparse_filename (str): Разреженный файл
+        param_ids (list): ID параметров в порядке колонок CSV
+        keyframe_interval (int): Ключевой кадр каждые N строк
+        force (bool): Перезаписать существующий разреженный файл
+
+    Возвращает:
+        int: Количество перенесенных строк
+    """
+    if os.path.exists(sparse_filename) and not force:
+        # Например, файл уже пишется синхронизатором в режиме "both"
+        raise FileExistsError(f"{sparse_filename} уже существует")
+
+    recorder = SparseRecorder(sparse_filename, param_ids, keyframe_interval)
+    count = 0
+    tmp_filename = sparse_filename + ".tmp"
+    try:
+        with open(csv_filename, 'r', newline='', encoding='utf-8') as src, \
+                open(tmp_filename, 'w', newline='', encoding='utf-8') as dst:
+            writer = csv.writer(dst)
+            for row in csv.reader(src):
+                if not row or row[0] == "timestamp" or len(row) != len(param_ids) + 2:
+                    continue
+                writer.writerows(recorder.encode(float(row[0]), dict(zip(param_ids, row[2:]))))
+                count += 1
+        os.replace(tmp_filename, sparse_filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return count
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if arg != "--force"]
+    force = "--force" in sys.argv[1:]
+    if len(args) != 3 or args[0] != "convert":
+        print("Использование: python owen_sparse_store.py convert <файл.csv> <файл.sparse> [--force]")
+        sys.exit(1)
+
+    with open("owen_config.json", 'r', encoding='utf-8') as f:
+        param_ids = json.load(f)["parameter_ids"]
+    try:
+        count = convert_csv(args[1], args[2], param_ids, force=force)
+    except FileExistsError as e:
+        print(f"[!] {e}. Чтобы перезаписать его, добавьте --force")
+        sys.exit(1)
+    before = os.path.getsize(args[1])
+    after = os.path.getsize(args[2])
+    print(f"[+] Строк: {count}, размер: {before} → {after} байт ({after / before * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Очередь записи параметров прибора.
+Записи от синхронизатора и веб-интерфейса объединяются: повторная запись в тот же
+параметр заменяет ожидающее значение, а все ожидающие записи уходят одним запросом
+/parameters/write-data (вместе с записью indicator_of_new_cycle или вне активного окна).
+
+Веб-интерфейс передает запросы через каталог WRITE_SPOOL_DIR (по файлу на запрос,
+файл появляется атомарно через переименование), результаты синхронизатор дописывает
+в WRITE_RESULTS_FILENAME.
+
+Неудачная отправка не теряет записи: они возвращаются в очередь (если за это время
+не пришло более новое значение того же параметра) и уходят со следующим запросом,
+пока не будет исчерпано WRITE_MAX_ATTEMPTS попыток.
+"""
+
+import json
+import os
+import time
+import uuid
+from typing import Optional, Callable, Dict, List, Any
+
+
+WRITE_SPOOL_DIR = "owen_write_spool"
+WRITE_RESULTS_FILENAME = "owen_write_results.jsonl"
+WRITE_MAX_ATTEMPTS = 5
+
+
+def submit_write(param_id: int, value: Any, source: str = "web",
+                 requested: Optional[float] = None, spool_dir: str = WRITE_SPOOL_DIR) -> Dict[str, Any]:
+    """
+    Поставить запись в очередь синхронизатора (из другого процесса).
+
+    Аргументы:
+        param_id (int): ID параметра
+        value: Новое значение
+        source (str): Источник записи
+        requested (float): Время запроса (по умолчанию - текущее)
+        spool_dir (str): Каталог очереди
+
+    Возвращает:
+        dict: Запрос с присвоенным request_id
+    """
+    request = {
+        "request_id": uuid.uuid4().hex,
+        "id": int(param_id),
+        "value": str(value),
+        "source": source,
+        "requested": time.time() if requested is None else requested
+    }
+    os.makedirs(spool_dir, exist_ok=True)
+    path = os.path.join(spool_dir, request["request_id"])
+    with open(path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(request, f)
+    os.replace(path + ".tmp", path + ".json")
+    return request
+
+
+class WriteQueue:
+    """Очередь записи с объединением по параметру и пакетной отправкой."""
+
+    def __init__(self, spool_dir: str = WRITE_SPOOL_DIR, results_filename: str = WRITE_RESULTS_FILENAME,
+                 max_attempts: int = WRITE_MAX_ATTEMPTS):
+        self.spool_dir = spool_dir
+        self.results_filename = results_filename
+        self.max_attempts = max_attempts
+        # {param_id: запрос}, порядок - порядок первой постановки в очередь
+        self.pending = {}
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def put(self, param_id: int, value: Any, source: str = "synchronizer",
+            request_id: Optional[str] = None, requested: Optional[float] = None):
+        """
+        Добавить запись. Ожидающая запись в тот же параметр заменяется новой.
+
+        Аргументы:
+            param_id (int): ID параметра
+            value: Новое значение
+            source (str): Источник записи
+            request_id (str): ID запроса (для отслеживания результата)
+            requested (float): Время запроса
+        """
+        param_id = int(param_id)
+        request = {
+            "request_id": request_id or uuid.uuid4().hex,
+            "id": param_id,
+            "value": str(value),
+            "source": source,
+            "requested": requested,
+            "coalesced": [],
+            "attempts": 0
+        }
+        previous = self.pending.get(param_id)
+        if previous:
+            request["coalesced"] = previous["coalesced"] + [previous["request_id"]]
+        self.pending[param_id] = request
+
+    def drain_spool(self) -> int:
+        """
+        Забрать запросы, поставленные другими процессами.
+
+        Возвращает:
+            int: Количество забранных запросов
+        """
+        try:
+            names = sorted(n for n in os.listdir(self.spool_dir) if n.endswith(".json"))
+        except FileNotFoundError:
+            return 0
+
+        # Запросы применяются в порядке постановки, чтобы при объединении победило последнее значение
+        requests = []
+        for name in names:
+            path = os.path.join(self.spool_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    requests.append(json.load(f))
+            except Exception as e:
+                print(f"[!] Некорректный запрос записи {name}: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+        requests.sort(key=lambda r: r.get("requested") or 0)
+        for request in requests:
+            self.put(request["id"], request["value"], request.get("source", "web"),
+                     request.get("request_id"), request.get("requested"))
+        return len(requests)
+
+    def flush(self, send: Callable[[List[Dict[str, Any]]], Optional[Dict[str, Any]]],
+              priority: Optional[List[Dict[str, Any]]] = None,
+              now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Отправить все ожидающие записи одним запросом.
+
+        Аргументы:
+            send: Функция отправки, принимает список {"id", "value"} и возвращает ответ API или None
+            priority (list): Записи, которые должны уйти в этом же запросе (например, indicator_of_new_cycle)
+            now (float): Время отправки (для журнала результатов)
+
+        Возвращает:
+            dict: Ответ API (с writeGroupId) или None, если запрос не выполнен или отправлять нечего
+        """
+        priority = priority or []
+        batch = list(self.pending.values())
+        self.pending = {}
+
+        # Параметры из priority не дублируем: приоритетное значение важнее
+        priority_ids = {int(item["id"]) for item in priority}
+        superseded = [r for r in batch if r["id"] in priority_ids]
+        batch = [r for r in batch if r["id"] not in priority_ids]
+
+        data = [{"id": int(item["id"]), "value": str(item["value"])} for item in priority]
+        data += [{"id": r["id"], "value": r["value"]} for r in batch]
+        if not data:
+            return None
+
+        result = send(data)
+        if result is None:
+            batch = self._requeue(batch, now)
+        self._record(batch, superseded, result, now)
+        return result
+
+    def _requeue(self, batch: List[Dict[str, Any]], now: Optional[float]) -> List[Dict[str, Any]]:
+        """
+        Вернуть в очередь записи из неудачного запроса.
+
+        Возвращает:
+            list: Записи, которые больше не повторяются (для журнала результатов)
+        """
+        final = []
+        retrying = []
+        for request in batch:
+            request = dict(request, attempts=request.get("attempts", 0) + 1)
+            # Более новое значение того же параметра заменит эту запись при put() (как coalesced)
+            if request["attempts"] < self.max_attempts:
+                self.pending[request["id"]] = request
+                retrying.append(dict(request, status="retrying", completed=now))
+            else:
+                final.append(request)
+
+        if retrying:
+            print(f"[*] Запись не выполнена, повторим позже: {len(retrying)} параметр(ов)")
+            self._write_records(retrying)
+        return final
+
+    def _record(self, batch: List[Dict[str, Any]], superseded: List[Dict[str, Any]],
+                result: Optional[Dict[str, Any]], now: Optional[float]):
+        """Сохранить результат отправки для каждого запроса."""
+        group_id = result.get("writeGroupId") if result else None
+        status = "sent" if result else "failed"
+
+        records = []
+        for request in batch:
+            request = dict(request, attempts=request.get("attempts", 0) + (1 if result else 0))
+            records.append(dict(request, status=status, writeGroupId=group_id, completed=now))
+            for request_id in request["coalesced"]:
+                records.append({"request_id": request_id, "id": request["id"], "status": "coalesced",
+                                "replaced_by": request["request_id"], "completed": now})
+        for request in superseded:
+            records.append(dict(request, status="superseded", writeGroupId=group_id, completed=now))
+        self._write_records(records)
+
+    def _write_records(self, records: List[Dict[str, Any]]):
+        if not records:
+            return
+
+        try:
+            with open(self.results_filename, 'a', encoding='utf-8') as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except Exception as e:
+            print(f"[!] Ошибка записи результатов очереди: {e}")
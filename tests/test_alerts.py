@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка правил оповещений через MemoryNotifier.
+
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import unittest
+
+from owen_alerts import AlertEngine, MemoryNotifier, compile_rules
+
+
+NAMES = {"1": "Temp_1", "2": "Temp_2", "3": "Tok_1"}
+
+
+def make_engine(rules_config, default_cycle=None):
+    notifier = MemoryNotifier()
+    rules = compile_rules(rules_config, NAMES, started=0.0)
+    return AlertEngine(rules, [notifier], default_cycle=default_cycle), notifier
+
+
+def transitions(notifier):
+    return [(alert["time"], alert["rule"], alert["state"]) for alert in notifier.alerts]
+
+
+class ThresholdRuleTest(unittest.TestCase):
+
+    def test_fires_once_and_resolves(self):
+        engine, notifier = make_engine([{"name": "hot", "type": "threshold", "parameter": "Temp_*", "max": 50}])
+        engine.process(0, {1: "10", 2: "60"})
+        engine.process(10, {1: "10", 2: "70"})
+        engine.process(20, {1: "55", 2: "40"})
+
+        self.assertEqual(transitions(notifier), [
+            (0, "hot:Temp_2", "firing"),
+            (20, "hot:Temp_1", "firing"),
+            (20, "hot:Temp_2", "resolved"),
+        ])
+
+    def test_ignores_non_numeric_values(self):
+        engine, notifier = make_engine([{"type": "threshold", "parameter": "Temp_1", "min": 0}])
+        engine.process(0, {1: "N/A"})
+
+        self.assertEqual(notifier.alerts, [])
+
+
+class RateRuleTest(unittest.TestCase):
+
+    def test_rate_of_change(self):
+        engine, notifier = make_engine([{"name": "jump", "type": "rate", "parameter": "Tok_1", "max_per_second": 1}])
+        engine.process(0, {3: "0"})
+        engine.process(10, {3: "5"})
+        engine.process(20, {3: "100"})
+        engine.process(30, {3: "105"})
+
+        self.assertEqual(transitions(notifier), [(20, "jump", "firing"), (30, "jump", "resolved")])
+        self.assertAlmostEqual(notifier.alerts[0]["value"], 100.0)
+
+
+class StuckRuleTest(unittest.TestCase):
+
+    def test_stuck_value(self):
+        engine, notifier = make_engine([{"name": "stuck", "type": "stuck", "parameter": "Tok_1", "samples": 3}])
+        for timestamp in (0, 10, 20, 30):
+            engine.process(timestamp, {3: "7"})
+        engine.process(40, {3: "8"})
+
+        self.assertEqual(transitions(notifier), [(20, "stuck", "firing"), (40, "stuck", "resolved")])
+
+
+class NoUpdateRuleTest(unittest.TestCase):
+
+    def test_missed_cycles(self):
+        engine, notifier = make_engine([{"name": "silent", "type": "no_update", "factor": 2}])
+        engine.process(0, {1: "1"}, predicted_cycle=10)
+        engine.check(15)
+        engine.check(25)
+        engine.check(30)
+        engine.process(31, {1: "2"}, predicted_cycle=10)
+
+        self.assertEqual(transitions(notifier), [(25, "silent", "firing"), (31, "silent", "resolved")])
+
+    def test_default_cycle_before_measurement(self):
+        # Прибор молчит с момента запуска: измеренного цикла нет
+        engine, notifier = make_engine([{"name": "silent", "type": "no_update", "factor": 2}], default_cycle=60)
+        engine.check(100)
+        engine.check(121)
+
+        self.assertEqual(transitions(notifier), [(121, "silent", "firing")])
+
+    def test_no_cycle_no_alert(self):
+        engine, notifier = make_engine([{"type": "no_update", "factor": 2}])
+        engine.check(10000)
+
+        self.assertEqual(notifier.alerts, [])
+
+    def test_parameter_value_not_changing(self):
+        engine, notifier = make_engine([{"name": "flat", "type": "no_update", "parameter": "Temp_1", "factor": 3}])
+        engine.process(0, {1: "5"}, predicted_cycle=10)
+        engine.process(10, {1: "5"})
+        engine.process(20, {1: "5"})
+        engine.check(29)
+        engine.check(31)
+        engine.process(40, {1: "6"})
+
+        self.assertEqual(transitions(notifier), [(31, "flat", "firing"), (40, "flat", "resolved")])
+
+
+class AlertEngineTest(unittest.TestCase):
+
+    def test_submit_drops_when_queue_full(self):
+        rules = compile_rules([{"type": "threshold", "parameter": "Temp_1", "max": 1}], NAMES, 0.0)
+        engine = AlertEngine(rules, [MemoryNotifier()], max_queue=1)
+        engine.submit(0, {1: "5"})
+        engine.submit(1, {1: "5"})
+
+        self.assertEqual(engine.dropped, 1)
+
+    def test_failing_notifier_does_not_stop_others(self):
+        class Broken:
+            def notify(self, alert):
+                raise RuntimeError("нет связи")
+
+        notifier = MemoryNotifier()
+        rules = compile_rules([{"type": "threshold", "parameter": "Temp_1", "max": 1}], NAMES, 0.0)
+        engine = AlertEngine(rules, [Broken(), notifier])
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine.process(0, {1: "5"})
+
+        self.assertEqual(len(notifier.alerts), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка расписания опросов в виртуальном времени.
+
+    python -m unittest discover tests
+"""
+
+import threading
+import time
+import unittest
+
+from owen_clock import SystemClock, VirtualClock
+from owen_poll_scheduler import HedgedPoller, PollScheduler
+
+
+ACTIVE = 0.3
+IDLE = 5.0
+
+
+def run_polls(scheduler, clock, window, until, response_time):
+    """Опрашивать до момента until; каждый ответ занимает response_time. Возвращает моменты опросов."""
+    polls = []
+    while clock.monotonic() < until:
+        scheduler.wait(ACTIVE, IDLE, window)
+        polls.append(clock.monotonic())
+        clock.sleep(response_time)
+    return polls
+
+
+class PollSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = VirtualClock(start=0)
+        self.scheduler = PollScheduler(self.clock)
+        # Первый опрос - немедленно
+        self.scheduler.wait(ACTIVE, IDLE)
+
+    def test_fast_responses_skip_no_slots(self):
+        window = (10.0, 40.0)
+        polls = run_polls(self.scheduler, self.clock, window, 30.0, 0.05)
+
+        self.assertEqual(self.scheduler.skipped_slots, 0)
+        in_window = [t for t in polls if t >= window[0]]
+        self.assertAlmostEqual(in_window[0], window[0])
+        # Опросы идут точно по слотам окна, без дрейфа
+        for index, poll in enumerate(in_window):
+            self.assertAlmostEqual(poll, window[0] + index * ACTIVE, places=6)
+
+    def test_idle_polls_before_window(self):
+        window = (12.0, 40.0)
+        polls = run_polls(self.scheduler, self.clock, window, 12.0, 0.05)
+
+        self.assertEqual([round(t, 6) for t in polls], [5.0, 10.0, 12.0])
+
+    def test_slow_response_skips_missed_slots(self):
+        window = (10.0, 40.0)
+        run_polls(self.scheduler, self.clock, window, 10.0, 0.05)
+        # Ответ на опрос в начале окна занимает 1 сек: слоты 10.3, 10.6 и 10.9 пропущены
+        self.clock.sleep(1.0)
+        self.scheduler.wait(ACTIVE, IDLE, window)
+
+        self.assertEqual(self.scheduler.skipped_slots, 3)
+        self.assertAlmostEqual(self.clock.monotonic(), 11.2, places=6)
+
+    def test_idle_after_window_end(self):
+        window = (10.0, 11.0)
+        polls = run_polls(self.scheduler, self.clock, window, 20.0, 0.05)
+
+        self.assertEqual(self.scheduler.skipped_slots, 0)
+        after = [t for t in polls if t > window[1]]
+        self.assertAlmostEqual(after[1] - after[0], IDLE)
+
+    def test_reset_polls_immediately(self):
+        self.clock.sleep(2.0)
+        self.scheduler.reset()
+        started = self.clock.monotonic()
+        self.scheduler.wait(ACTIVE, IDLE, (10.0, 40.0))
+
+        self.assertEqual(self.clock.monotonic(), started)
+
+
+class HedgedPollerTest(unittest.TestCase):
+
+    def test_reports_times_of_winning_request(self):
+        poller = HedgedPoller(SystemClock(), percentile=0.5, min_samples=1)
+        poller.rtts.append(0.02)
+        calls = []
+        release = threading.Event()
+
+        def poll():
+            calls.append(time.time())
+            if len(calls) == 1:
+                # Основной запрос зависает - ответ дает дублирующий
+                release.wait(1.0)
+                return "slow"
+            return "fast"
+
+        result = poller.call(poll)
+        release.set()
+        poller.close()
+
+        self.assertEqual(result, "fast")
+        self.assertEqual(poller.hedge_wins, 1)
+        self.assertGreaterEqual(poller.last_sent, calls[1] - 0.01)
+        self.assertGreater(poller.last_sent, calls[0])
+        self.assertGreaterEqual(poller.last_recv, poller.last_sent)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Проверка очереди записи: объединение, повтор после ошибки и журнал результатов.
+
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from owen_write_queue import WriteQueue, submit_write
+
+
+class FakeSend:
+    """Отправка, которая отвечает заданными результатами и запоминает запросы."""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = []
+
+    def __call__(self, data):
+        self.calls.append(data)
+        return self.results.pop(0) if self.results else {"writeGroupId": f"group-{len(self.calls)}"}
+
+
+class WriteQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp(prefix="owen_write_queue_")
+        self.spool_dir = os.path.join(self.workdir, "spool")
+        self.results = os.path.join(self.workdir, "results.jsonl")
+        self.queue = WriteQueue(self.spool_dir, self.results, max_attempts=3)
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def flush(self, send, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return self.queue.flush(send, **kwargs)
+
+    def records(self):
+        if not os.path.exists(self.results):
+            return []
+        with open(self.results, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def statuses(self):
+        return [(r["request_id"], r["status"]) for r in self.records()]
+
+    def test_coalesces_writes_to_same_parameter(self):
+        self.queue.put(1, 10, request_id="a")
+        self.queue.put(2, 20, request_id="b")
+        self.queue.put(1, 11, request_id="c")
+        send = FakeSend()
+        result = self.flush(send, now=1.0)
+
+        self.assertEqual(result, {"writeGroupId": "group-1"})
+        self.assertEqual(send.calls, [[{"id": 1, "value": "11"}, {"id": 2, "value": "20"}]])
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.statuses(), [("c", "sent"), ("a", "coalesced"), ("b", "sent")])
+        self.assertEqual(self.records()[1]["replaced_by"], "c")
+
+    def test_priority_goes_first_and_supersedes(self):
+        self.queue.put(5, 1, request_id="a")
+        self.queue.put(6, 2, request_id="b")
+        send = FakeSend()
+        self.flush(send, priority=[{"id": 5, "value": 7}], now=1.0)
+
+        self.assertEqual(send.calls, [[{"id": 5, "value": "7"}, {"id": 6, "value": "2"}]])
+        self.assertEqual(self.statuses(), [("b", "sent"), ("a", "superseded")])
+
+    def test_failed_batch_is_requeued(self):
+        self.queue.put(1, 10, request_id="a")
+        send = FakeSend(None)
+        self.assertIsNone(self.flush(send, priority=[{"id": 9, "value": 1}], now=1.0))
+
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.statuses(), [("a", "retrying")])
+
+        self.flush(send, now=2.0)
+        self.assertEqual(send.calls[-1], [{"id": 1, "value": "10"}])
+        self.assertEqual(self.records()[-1]["status"], "sent")
+        self.assertEqual(self.records()[-1]["attempts"], 2)
+
+    def test_newer_value_replaces_requeued_write(self):
+        self.queue.put(1, 10, request_id="a")
+        self.flush(FakeSend(None), now=1.0)
+        self.queue.put(1, 11, request_id="b")
+        send = FakeSend()
+        self.flush(send, now=2.0)
+
+        self.assertEqual(send.calls, [[{"id": 1, "value": "11"}]])
+        self.assertEqual(self.statuses(), [("a", "retrying"), ("b", "sent"), ("a", "coalesced")])
+
+    def test_gives_up_after_max_attempts(self):
+        self.queue.put(1, 10, request_id="a")
+        send = FakeSend(None, None, None)
+        for now in (1.0, 2.0, 3.0):
+            self.flush(send, now=now)
+
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(self.statuses(), [("a", "retrying"), ("a", "retrying"), ("a", "failed")])
+        self.assertEqual(self.records()[-1]["attempts"], 3)
+
+    def test_nothing_to_send(self):
+        send = FakeSend()
+        self.assertIsNone(self.flush(send))
+        self.assertEqual(send.calls, [])
+
+    def test_drain_spool_in_request_order(self):
+        submit_write(1, 10, requested=2.0, spool_dir=self.spool_dir)
+        submit_write(1, 11, requested=1.0, spool_dir=self.spool_dir)
+        submit_write(2, 20, requested=3.0, spool_dir=self.spool_dir)
+
+        self.assertEqual(self.queue.drain_spool(), 3)
+        self.assertEqual(os.listdir(self.spool_dir), [])
+        # Побеждает последнее по времени запроса значение, а не порядок файлов
+        self.assertEqual(self.queue.pending[1]["value"], "10")
+        self.assertEqual(len(self.queue), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
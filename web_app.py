@@ -1,40 +1,173 @@
-from flask import Flask, send_file, render_template, jsonify
-import pandas as pd
-import os
+from flask import Flask, Response, render_template, jsonify, request
+from datetime import datetime
+import csv
+import hashlib
+import hmac
 import io
+import json
+import math
+import os
+import re
+import zlib
+from urllib.parse import urlencode
+
+from owen_alerts import get_alerts_log_path
+from owen_cycle_trace import load_cycle_traces, read_tail_lines
+from owen_ring_buffer import read_recent
+from owen_sparse_store import SPARSE_FILENAME, iter_rows, read_rows
+from owen_write_queue import submit_write, WRITE_SPOOL_DIR, WRITE_RESULTS_FILENAME
 
 app = Flask(__name__)
 CSV_FILE = 'owen_cloud_data.csv'
+CONFIG_FILE = 'owen_config.json'
+# Токен для /write (заголовок X-Write-Token). Без него запись уставок принимается только с этого компьютера
+WRITE_TOKEN = os.environ.get('OWEN_WRITE_TOKEN')
+
+def load_config():
+    try:
+        with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Error reading config: {e}")
+        return None
+
+def get_columns(param_ids=None):
+    """
+    Колонки CSV в порядке записи синхронизатором (см. initialize_csv).
+    Берутся из owen_config.json, так как у существующего файла может не быть заголовка.
+    """
+    config = load_config()
+    if config is None:
+        return None
+
+    columns = ['timestamp', 'datetime']
+    names = config.get('parameter_names', {})
+    for param_id in param_ids if param_ids is not None else config.get('parameter_ids', []):
+        param_name = names.get(str(param_id), f"Param_{param_id}")
+        columns.append(f"{param_name} (ID:{param_id})")
+    return columns
+
+def get_file_columns():
+    """
+    Колонки файла данных и длина заголовка в байтах.
+    Заголовок есть только у файлов, созданных initialize_csv.
+    """
+    with open(CSV_FILE, 'rb') as f:
+        first_line = f.readline()
+
+    if first_line.startswith(b'timestamp,'):
+        return next(csv.reader([first_line.decode('utf-8')])), len(first_line)
+    return get_columns(), 0
+
+def format_value(value):
+    if math.isnan(value):
+        return 'N/A'
+    return str(int(value)) if value.is_integer() else repr(value)
+
+def get_recent_data(limit):
+    """
+    Последние строки из буфера синхронизатора в разделяемой памяти (без чтения диска).
+    None, если буфер недоступен или в нем меньше limit строк (например, после перезапуска).
+    """
+    recent = read_recent(limit)
+    if recent is None:
+        return None
+    param_ids, samples = recent
+    if len(samples) < limit:
+        return None
+
+    columns = get_columns(param_ids)
+    rows = []
+    for timestamp, values in samples:
+        row = [repr(timestamp), datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]]
+        row += [format_value(v) for v in values]
+        rows.append(dict(zip(columns, row)))
+
+    return {
+        'columns': columns,
+        'table': rows[::-1],
+        'chart': rows
+    }
+
+def get_sparse_data(limit):
+    """Последние строки из разреженной записи (режим RECORDING_MODE = "sparse")."""
+    columns = get_columns()
+    rows = [dict(zip(columns, values)) for values in read_rows(SPARSE_FILENAME, limit)
+            if len(values) == len(columns)]
+    if not rows:
+        return None
+    return {
+        'columns': columns,
+        'table': rows[::-1],
+        'chart': rows
+    }
+
+def get_data_source(config=None):
+    """
+    Файл, в который пишет синхронизатор: (путь, True для разреженного формата) или None.
+    Режим берется из owen_config.json (recording_mode сохраняет синхронизатор),
+    для конфигов без него - более свежий из двух файлов.
+    """
+    config = config if config is not None else (load_config() or {})
+    mode = config.get('recording_mode')
+    if mode == 'sparse':
+        return (SPARSE_FILENAME, True) if os.path.exists(SPARSE_FILENAME) else None
+    if mode in ('csv', 'both'):
+        return (CSV_FILE, False) if os.path.exists(CSV_FILE) else None
+
+    existing = [path for path in (CSV_FILE, SPARSE_FILENAME) if os.path.exists(path)]
+    if not existing:
+        return None
+    path = max(existing, key=os.path.getmtime)
+    return path, path == SPARSE_FILENAME
 
 def get_data(limit=100):
-    if not os.path.exists(CSV_FILE):
+    data = get_recent_data(limit)
+    if data is not None:
+        return data
+
+    source = get_data_source()
+    if source is None:
         return None
+    if source[1]:
+        return get_sparse_data(limit)
     
     try:
-        # Читаем CSV, пропуская возможные битые строки
-        df = pd.read_csv(CSV_FILE)
-        
+        columns, _ = get_file_columns()
+
+        rows = []
+        for values in csv.reader(read_tail_lines(CSV_FILE, limit + 1)):
+            if values == columns:
+                continue
+            if columns is None:
+                columns = ['timestamp', 'datetime'] + [f"col_{i}" for i in range(2, len(values))]
+            # Пропускаем битые строки
+            if len(values) != len(columns):
+                continue
+            rows.append(dict(zip(columns, values)))
+        rows = rows[-limit:]
+
         # Если файл пустой
-        if df.empty:
+        if not rows:
             return None
-            
-        # Берем последние limit строк
-        df_tail = df.tail(limit)
-        
-        # Сортируем: новые сверху (для таблицы)
-        df_display = df_tail.iloc[::-1]
-        
-        # Для графика нужны данные в хронологическом порядке
-        df_chart = df_tail
         
         return {
-            'table': df_display,
-            'chart': df_chart
+            'columns': columns,
+            # Сортируем: новые сверху (для таблицы)
+            'table': rows[::-1],
+            # Для графика нужны данные в хронологическом порядке
+            'chart': rows
         }
     except Exception as e:
         print(f"Error reading CSV: {e}")
         return None
 
+def to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
 @app.route('/')
 def index():
     data = get_data(100)
@@ -43,31 +176,37 @@ def index():
         return render_template('index.html', error="Файл данных пока не создан или пуст.")
     
     # Подготовка данных для таблицы
-    columns = data['table'].columns.tolist()
-    records = data['table'].to_dict('records')
+    columns = data['columns']
+    records = data['table']
     
     # Подготовка данных для графика (преобразуем в JSON-friendly формат)
     # Предполагаем, что datetime - это ось X, а остальные (кроме timestamp) - серии
     chart_data = {
-        'labels': data['chart']['datetime'].tolist(),
+        'labels': [row['datetime'] for row in data['chart']],
         'datasets': []
     }
     
-    # Пытаемся определить числовые колонки для графика
+    # Числовые колонки для графика: все значения преобразуются в число
     # Исключаем timestamp и datetime
-    numeric_cols = data['chart'].select_dtypes(include=['float64', 'int64']).columns.tolist()
-    numeric_cols = [c for c in numeric_cols if c not in ['timestamp']]
-    
-    # Если не нашли числовых (все строки?), пробуем все кроме времени
-    if not numeric_cols:
-         cols = data['chart'].columns.tolist()
-         numeric_cols = [c for c in cols if c not in ['timestamp', 'datetime']]
+    series = {}
+    for col in columns:
+        if col in ['timestamp', 'datetime']:
+            continue
+        values = [to_number(row[col]) for row in data['chart']]
+        if all(v is not None for v in values):
+            series[col] = values
+
+    # Если не нашли числовых, выводим все кроме времени (нечисловые точки пропускаются)
+    if not series:
+        for col in columns:
+            if col not in ['timestamp', 'datetime']:
+                series[col] = [to_number(row[col]) for row in data['chart']]
 
-    for col in numeric_cols:
+    for col, values in series.items():
         # Простая генерация цветов не помешала бы, но Chart.js может и сам, или зададим базовый набор
         chart_data['datasets'].append({
             'label': col,
-            'data': data['chart'][col].tolist(),
+            'data': values,
             'borderWidth': 2,
             'tension': 0.4, # Сглаживание
             'pointRadius': 2
@@ -76,13 +215,437 @@ def index():
     return render_template('index.html', 
                            columns=columns, 
                            records=records, 
-                           chart_data=chart_data)
+                           chart_data=chart_data,
+                           traces=load_cycle_traces(20))
+
+@app.route('/traces')
+def traces():
+    # Трассировка задержек последних циклов (смещения в мс от оценки момента изменения)
+    return jsonify(load_cycle_traces(200))
+
+@app.route('/alerts')
+def alerts():
+    # Последние оповещения (пишет FileNotifier синхронизатора, путь - из owen_alerts.json), новые первыми
+    results = []
+    path = get_alerts_log_path()
+    if path and os.path.exists(path):
+        for line in read_tail_lines(path, 200):
+            # Пропускаем битые строки
+            try:
+                results.append(json.loads(line))
+            except ValueError:
+                continue
+    state = request.args.get('state')
+    if state:
+        results = [r for r in results if r.get('state') == state]
+    return jsonify(results[::-1])
+
+# =============================================================================
+# ЭКСПОРТ ДАННЫХ
+# =============================================================================
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_PARQUET_ROWS = 10000
+# Размеры уже сформированных выгрузок по ETag: докачка не кодирует выгрузку дважды
+EXPORT_SIZE_CACHE = {}
+EXPORT_SIZE_CACHE_LIMIT = 100
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+def parse_time(value):
+    """Время из запроса: unix timestamp или дата 'YYYY-MM-DD[ HH:MM[:SS]]' (локальное время)."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value.replace('T', ' ')).timestamp()
+
+def select_columns(columns, requested):
+    """
+    Индексы выбранных колонок. Колонку можно указать полным названием,
+    именем параметра (Temp_1) или его ID. timestamp и datetime выводятся всегда.
+    """
+    if not requested:
+        return list(range(len(columns)))
+
+    selected = [0, 1]
+    for item in (c.strip() for c in requested.split(',')):
+        if not item or item in ('timestamp', 'datetime'):
+            continue
+        for i, col in enumerate(columns):
+            match = re.match(r'^(.*) \(ID:(\d+)\)$', col)
+            if col == item or (match and item in match.groups()):
+                if i not in selected:
+                    selected.append(i)
+                break
+        else:
+            raise ValueError(f"Неизвестная колонка: {item}")
+    return selected
+
+def line_start(f, position, start):
+    """Начало первой строки файла, которая начинается не раньше position."""
+    if position <= start:
+        return start
+    f.seek(position - 1)
+    f.readline()
+    return f.tell()
+
+def find_offset(f, timestamp, start, end):
+    """
+    Бинарный поиск начала первой строки с меткой времени >= timestamp.
+    Файл пишется только в конец, поэтому строки упорядочены по времени.
+    """
+    lo, hi = start, end
+    while lo < hi:
+        mid = (lo + hi) // 2
+        position = line_start(f, mid, start)
+        if position >= end:
+            hi = mid
+            continue
+        f.seek(position)
+        try:
+            line_ts = float(f.readline().split(b',', 1)[0])
+        except ValueError:
+            line_ts = float('-inf')
+        if line_ts >= timestamp:
+            hi = mid
+        else:
+            lo = position + 1
+    return min(line_start(f, lo, start), end)
+
+def iter_export_rows(time_from, time_to, indexes, columns, header_size, snapshot):
+    """Строки файла данных в интервале [time_from, time_to] (только выбранные колонки)."""
+    with open(CSV_FILE, 'rb') as f:
+        offset = header_size
+        if time_from is not None:
+            offset = find_offset(f, time_from, header_size, snapshot)
+        f.seek(offset)
+
+        while offset < snapshot:
+            line = f.readline()
+            offset += len(line)
+            # Строка, дописываемая синхронизатором прямо сейчас, в выгрузку не попадает
+            if not line.endswith(b'\n') or offset > snapshot:
+                break
+            values = next(csv.reader([line.decode('utf-8', errors='replace')]), None)
+            if not values or len(values) != len(columns):
+                continue
+            try:
+                row_ts = float(values[0])
+            except ValueError:
+                continue
+            if time_from is not None and row_ts < time_from:
+                continue
+            if time_to is not None and row_ts > time_to:
+                break
+            yield [values[i] for i in indexes]
+
+def iter_sparse_export_rows(time_from, time_to, indexes, snapshot):
+    """То же для разреженной записи: строки восстанавливаются из ключевых кадров и изменений."""
+    for timestamp, _, values in iter_rows(SPARSE_FILENAME, end=snapshot):
+        if time_from is not None and timestamp < time_from:
+            continue
+        if time_to is not None and timestamp > time_to:
+            break
+        row = [repr(timestamp), datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]] + values
+        yield [row[i] for i in indexes]
+
+def encode_csv(header, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+def encode_gzip(chunks):
+    # wbits=31 - формат gzip; заголовок без времени, поэтому результат воспроизводим (нужно для Range)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def encode_ndjson(header, rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        record = {}
+        for name, value in zip(header, row):
+            number = to_number(value) if name != 'datetime' else None
+            if number is not None and number.is_integer() and name != 'timestamp':
+                number = int(number)
+            record[name] = number if number is not None else value
+        line = (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    yield b''.join(buffer)
+
+def encode_parquet(header, rows):
+    # pyarrow нужен только для этого формата, поэтому импортируем лениво
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    class Sink:
+        """Файловый объект, отдающий записанные pyarrow байты по частям."""
+        closed = False
+        def __init__(self):
+            self.chunks = []
+            self.position = 0
+        def write(self, data):
+            self.chunks.append(bytes(data))
+            self.position += len(data)
+            return len(data)
+        def tell(self):
+            return self.position
+        def flush(self):
+            pass
+        def close(self):
+            self.closed = True
+
+    schema = pa.schema([(name, pa.string() if name == 'datetime' else pa.float64()) for name in header])
+    sink = Sink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode='w'), schema, compression='zstd')
+
+    def flush(batch):
+        arrays = [pa.array(column, type=field.type) for column, field in zip(zip(*batch), schema)]
+        writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        data = b''.join(sink.chunks)
+        sink.chunks = []
+        return data
+
+    batch = []
+    for row in rows:
+        batch.append([value if name == 'datetime' else to_number(value) for name, value in zip(header, row)])
+        if len(batch) >= EXPORT_PARQUET_ROWS:
+            yield flush(batch)
+            batch = []
+    if batch:
+        yield flush(batch)
+    writer.close()
+    yield b''.join(sink.chunks)
+
+def export_stream(fmt, header, rows):
+    if fmt == 'ndjson':
+        return encode_ndjson(header, rows)
+    if fmt == 'parquet':
+        return encode_parquet(header, rows)
+    chunks = encode_csv(header, rows)
+    return encode_gzip(chunks) if fmt == 'csv.gz' else chunks
+
+def slice_stream(chunks, start, end):
+    """Байты [start, end] из потока чанков."""
+    position = 0
+    for chunk in chunks:
+        chunk_end = position + len(chunk)
+        if chunk_end > start and position <= end:
+            yield chunk[max(0, start - position):end - position + 1]
+        position = chunk_end
+        if position > end:
+            break
+
+def remember_size(etag, total):
+    EXPORT_SIZE_CACHE.pop(etag, None)
+    EXPORT_SIZE_CACHE[etag] = total
+    while len(EXPORT_SIZE_CACHE) > EXPORT_SIZE_CACHE_LIMIT:
+        del EXPORT_SIZE_CACHE[next(iter(EXPORT_SIZE_CACHE))]
+
+def counted_stream(chunks, etag):
+    """Поток чанков, размер которого запоминается, если он отдан полностью."""
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        yield chunk
+    remember_size(etag, total)
+
+def parse_range(header):
+    """Диапазон из заголовка Range (поддерживается один диапазон)."""
+    match = re.match(r'^bytes=(\d*)-(\d*)$', header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    return match.groups()
+
+@app.route('/export')
+def export():
+    """
+    Потоковая выгрузка данных.
+    Параметры: from, to (unix time или дата), columns (через запятую), format (csv|csv.gz|ndjson|parquet),
+    snapshot (размер файла в байтах, фиксирует содержимое для докачки).
+
+    Range без If-Range для csv.gz и parquet выполняется только с snapshot в запросе,
+    иначе отдается полная выгрузка (200).
+
+    Размер результата заранее неизвестен, поэтому для ответа на Range выгрузка
+    кодируется дважды: сначала для подсчета размера, затем для отдачи диапазона.
+    Размер запоминается по ETag (в том числе после полной выгрузки без Range),
+    так что повторные запросы докачки кодируют выгрузку один раз. Для csv.gz и
+    parquet всей истории первый запрос с Range стоит двух полных проходов.
+    """
+    # Выгружаем из файла, который сейчас пишет синхронизатор (CSV или разреженная запись)
+    data_source = get_data_source()
+    if data_source is None:
+        return "Файл не найден", 404
+    source, sparse = data_source
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return f"Неизвестный формат: {fmt}", 400
+    if fmt == 'parquet':
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            return "Формат parquet недоступен: не установлен pyarrow", 501
+
+    try:
+        time_from = parse_time(request.args.get('from'))
+        time_to = parse_time(request.args.get('to'))
+        columns, header_size = get_columns(), 0
+        if not sparse:
+            columns, header_size = get_file_columns()
+        if columns is None:
+            return "Не удалось определить колонки файла", 500
+        indexes = select_columns(columns, request.args.get('columns'))
+    except ValueError as e:
+        return str(e), 400
+
+    # Файл растет, поэтому выгрузка ограничена его размером на момент первого запроса
+    file_size = os.path.getsize(source)
+    snapshot = request.args.get('snapshot', type=int) or file_size
+    snapshot = min(snapshot, file_size)
+
+    header = [columns[i] for i in indexes]
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    etag = hashlib.sha1(json.dumps(
+        [fmt, time_from, time_to, indexes, snapshot, os.stat(source).st_ino]
+    ).encode('utf-8')).hexdigest()
+
+    def stream():
+        if sparse:
+            rows = iter_sparse_export_rows(time_from, time_to, indexes, snapshot)
+        else:
+            rows = iter_export_rows(time_from, time_to, indexes, columns, header_size, snapshot)
+        return export_stream(fmt, header, rows)
+
+    query = request.args.to_dict()
+    query['snapshot'] = str(snapshot)
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'ETag': f'"{etag}"',
+        'Content-Location': '/export?' + urlencode(query),
+        'Content-Disposition': f'attachment; filename=owen_data.{extension}',
+    }
+
+    byte_range = parse_range(request.headers.get('Range', ''))
+    if_range = request.headers.get('If-Range')
+    if if_range:
+        resumable = if_range.strip('"') == etag
+    else:
+        # Без snapshot содержимое зафиксировано размером файла сейчас. Для csv и ndjson новые строки
+        # только дописываются в конец, а сжатый поток (csv.gz, parquet) меняется целиком -
+        # его докачка возможна только по адресу из Content-Location
+        resumable = 'snapshot' in request.args or fmt in ('csv', 'ndjson')
+    if byte_range and resumable:
+        total = EXPORT_SIZE_CACHE.get(etag)
+        if total is None:
+            # Размер результата заранее неизвестен - считаем его проходом без хранения данных
+            total = sum(len(chunk) for chunk in stream())
+            remember_size(etag, total)
+        first, last = byte_range
+        if first:
+            start, end = int(first), min(int(last), total - 1) if last else total - 1
+        else:
+            start, end = max(0, total - int(last)), total - 1
+        if start >= total or start > end:
+            return Response(status=416, headers={'Content-Range': f'bytes */{total}'})
+        headers['Content-Range'] = f'bytes {start}-{end}/{total}'
+        headers['Content-Length'] = str(end - start + 1)
+        return Response(slice_stream(stream(), start, end), status=206, mimetype=mimetype, headers=headers)
+
+    return Response(counted_stream(stream(), etag), mimetype=mimetype, headers=headers)
+
+# =============================================================================
+# ЗАПИСЬ ПАРАМЕТРОВ
+# =============================================================================
+
+def find_parameter(config, param):
+    """ID параметра по имени или ID из конфигурации."""
+    names = config.get('parameter_names', {})
+    for param_id in config.get('parameter_ids', []):
+        if str(param) == str(param_id) or param == names.get(str(param_id)):
+            return int(param_id)
+    return None
+
+@app.route('/write', methods=['POST'])
+def write():
+    """
+    Поставить запись уставки в очередь синхронизатора.
+    Тело JSON: {"param": имя или ID параметра, "value": число}.
+    Нужен заголовок X-Write-Token (если задан OWEN_WRITE_TOKEN), иначе - запрос с localhost.
+    """
+    if WRITE_TOKEN:
+        if not hmac.compare_digest(request.headers.get('X-Write-Token', ''), WRITE_TOKEN):
+            return jsonify({'error': "Неверный токен записи"}), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': "Запись разрешена только с localhost (задайте OWEN_WRITE_TOKEN)"}), 403
+
+    payload = request.get_json(silent=True) or {}
+    if 'param' not in payload or 'value' not in payload:
+        return jsonify({'error': "Нужны поля 'param' и 'value'"}), 400
+    # Значение, которое отклонит облако, сорвало бы всю пакетную запись вместе с indicator_of_new_cycle
+    value = payload['value']
+    number = None if isinstance(value, bool) else to_number(value)
+    if number is None or not math.isfinite(number):
+        return jsonify({'error': f"Значение должно быть числом: {value}"}), 400
+
+    config = load_config()
+    if config is None:
+        return jsonify({'error': "Конфигурация не найдена"}), 500
+
+    param_id = find_parameter(config, payload['param'])
+    if param_id is None:
+        return jsonify({'error': f"Неизвестный параметр: {payload['param']}"}), 400
+    # Служебными параметрами управляет цикл синхронизации
+    if param_id in (config.get('synchronization_param_id'), config.get('indicator_param_id')):
+        return jsonify({'error': "Параметр управляется синхронизатором"}), 400
+
+    queued = submit_write(param_id, value)
+    return jsonify(queued), 202
+
+@app.route('/write/status')
+def write_status():
+    """Результаты последних записей (или одной записи по request_id) и размер очереди."""
+    results = []
+    if os.path.exists(WRITE_RESULTS_FILENAME):
+        results = [json.loads(line) for line in read_tail_lines(WRITE_RESULTS_FILENAME, 200)]
+
+    request_id = request.args.get('request_id')
+    if request_id:
+        results = [r for r in results if r.get('request_id') == request_id]
+
+    queued = 0
+    if os.path.isdir(WRITE_SPOOL_DIR):
+        queued = sum(1 for name in os.listdir(WRITE_SPOOL_DIR) if name.endswith('.json'))
+
+    return jsonify({'queued': queued, 'results': results[::-1]})
 
 @app.route('/download')
 def download():
-    if not os.path.exists(CSV_FILE):
-        return "Файл не найден", 404
-    return send_file(CSV_FILE, as_attachment=True, download_name='owen_data.csv')
+    # Полная выгрузка CSV (с заголовком)
+    return export()
 
 if __name__ == '__main__':
     # Запуск на всех интерфейсах, порт 5000